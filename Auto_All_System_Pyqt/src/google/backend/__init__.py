@@ -49,6 +49,7 @@ from .sheerlink_service import (
 from .bind_card_service import (
     auto_bind_card,
     process_bind_card,
+    process_bind_cards,
 )
 from .all_in_one_service import (
     process_all_in_one,
@@ -80,6 +81,7 @@ __all__ = [
     # 绑卡服务
     'auto_bind_card',
     'process_bind_card',
+    'process_bind_cards',
     # 全自动服务
     'process_all_in_one',
 ]
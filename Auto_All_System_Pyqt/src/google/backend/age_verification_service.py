@@ -5,10 +5,12 @@
 """
 
 import asyncio
+import itertools
 import time
 import re
 import os
 import tempfile
+from functools import lru_cache
 from typing import Callable, Dict, Optional, Tuple, List
 
 from playwright.async_api import async_playwright, Page
@@ -21,6 +23,24 @@ DEFAULT_CITY = "New York"
 DEFAULT_STATE = "New York"
 AGE_VERIFICATION_SERVICE_REV = "2026-01-24-accept-gate-1"
 
+# 卡表单 get_by_label / get_by_role / get_by_placeholder 兜底用的正则
+_LBL_CARD = re.compile(r"card\s*number|卡号", re.I)
+_LBL_EXP = re.compile(r"mm/yy|expir|有效期", re.I)
+_LBL_CVV = re.compile(r"security\s*code|cvc|cvv|安全码", re.I)
+_PH_MMYY = re.compile(r"mm/yy", re.I)
+_PH_CVV = re.compile(r"security\s*code|cvc|cvv", re.I)
+
+# str.translate 删除表：短字符串上比 re.sub 快（仅覆盖 Latin-1，其余字符走正则兜底）
+_NON_DIGIT_DEL = str.maketrans("", "", "".join(chr(c) for c in range(256) if not chr(c).isdigit()))
+
+
+def _digits_only(value: str) -> str:
+    digits = (value or "").translate(_NON_DIGIT_DEL)
+    if digits.isascii():
+        return digits
+    return re.sub(r"\D", "", digits)
+
+
 def _mask_card(number: str) -> str:
     if not number:
         return "****"
@@ -99,17 +119,58 @@ def update_card_usage(card_id: int):
         print(f"[AgeVerify] 更新卡片使用次数失败: {e}")
 
 
-def _collect_payment_frames(page: Page) -> List[object]:
-    frames: List[object] = []
-    for frame in page.frames:
-        url = (frame.url or "").lower()
-        name = (frame.name or "").lower()
-        if any(k in url for k in ["payments.google.com", "pay.google.com", "tokenized.play.google.com", "buyflow", "instrumentmanager", "payment"]):
-            frames.append(frame)
+def _collect_payment_frames(page: Page, all_frames: Optional[List[object]] = None) -> List[object]:
+    """all_frames 可传入调用方已取到的 page.frames，避免重复遍历 frame 树"""
+    frames = page.frames if all_frames is None else all_frames
+    return [frame for frame in frames if _is_payment_frame(frame)]
+
+
+def _is_payment_frame(frame) -> bool:
+    url = (frame.url or "").lower()
+    if any(k in url for k in ["payments.google.com", "pay.google.com", "tokenized.play.google.com", "buyflow", "instrumentmanager", "payment"]):
+        return True
+    name = (frame.name or "").lower()
+    return any(k in name for k in ["paymentsmodaliframe", "ucc-"])
+
+
+_PAY_HOSTS = ("payments.google.com", "pay.google.com", "tokenized.play.google.com")
+_NON_PAYMENT_HOSTS = (
+    "doubleclick.net",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "googlesyndication.com",
+    "recaptcha",
+)
+
+
+def _looks_payment(url: str) -> bool:
+    u = (url or "").lower()
+    return any(h in u for h in _PAY_HOSTS)
+
+
+def _card_form_scopes(page: Page) -> List[object]:
+    """
+    @brief 卡表单查找范围：支付 iframe 优先，其次其他 frame，最后主页面；同一 frame 只出现一次
+    @details frame 过滤只在这里做：有支付 iframe 时其他 frame 跳过广告/统计域名（同源包装 frame 仍会探测），
+             一个支付 iframe 都没识别到时不过滤，全部 frame 都探测
+    """
+    all_frames = list(page.frames)
+    payment = _collect_payment_frames(page, all_frames)
+    payment.sort(key=lambda f: not _looks_payment(f.url))
+    if payment:
+        others = [f for f in all_frames if not any(h in (f.url or "").lower() for h in _NON_PAYMENT_HOSTS)]
+    else:
+        others = all_frames
+
+    # 只按 frame 本身去重：同 URL 的不同 frame（如多个 about:srcdoc 支付 iframe）可能只有一个承载表单
+    scopes: List[object] = []
+    seen_ids = set()
+    for scope in [*payment, *others, page]:
+        if id(scope) in seen_ids:
             continue
-        if any(k in name for k in ["paymentsmodaliframe", "ucc-"]):
-            frames.append(frame)
-    return frames
+        seen_ids.add(id(scope))
+        scopes.append(scope)
+    return scopes
 
 
 def _is_payment_related_url(url: str) -> bool:
@@ -466,6 +527,15 @@ async def _select_country_in_frame(
     return False
 
 
+_NL_EXACT = frozenset({"nl", "nld", "荷兰", "荷蘭"})
+_NL_SUBSTR = ("netherlands", "nederland", "holland")
+
+
+def _is_netherlands(value: str) -> bool:
+    low = (value or "").strip().lower()
+    return low in _NL_EXACT or any(k in low for k in _NL_SUBSTR)
+
+
 def _normalize_country(value: str) -> str:
     if not value:
         return ""
@@ -478,6 +548,23 @@ def _normalize_country(value: str) -> str:
     return val
 
 
+# 卡信息缺失时按国家兜底的 (city, state, zip)
+_COUNTRY_FALLBACKS = {
+    "China": ("Beijing", "Beijing", "100000"),
+    "Netherlands": ("Amsterdam", "Noord-Holland", "1234AB"),
+}
+
+
+@lru_cache(maxsize=64)
+def _country_fallbacks(country: str) -> Tuple[str, str, str, bool]:
+    """返回 (fallback_city, fallback_state, fallback_zip, is_netherlands)，同一国家只计算一次"""
+    # 荷兰只在兜底查表时归一（_normalize_country 保持原样，国家下拉框仍按“荷兰”等原文匹配）
+    is_nl = _is_netherlands(country)
+    norm = "Netherlands" if is_nl else _normalize_country(country)
+    city, state, zip_code = _COUNTRY_FALLBACKS.get(norm, (DEFAULT_CITY, DEFAULT_STATE, DEFAULT_ZIP_CODE))
+    return city, state, zip_code, is_nl
+
+
 async def _select_country(page: Page, country_label: str, log: Callable[[str], None]) -> bool:
     """尝试在 payments/buyflow iframe 中选择 Country/region（多语言兜底）"""
     normalized = _normalize_country(country_label)
@@ -498,10 +585,11 @@ async def _select_country(page: Page, country_label: str, log: Callable[[str], N
     except Exception:
         buyflow = None
 
-    for fr in _collect_payment_frames(page):
+    all_frames = list(page.frames)
+    for fr in _collect_payment_frames(page, all_frames):
         if fr not in frames:
             frames.append(fr)
-    for fr in page.frames:
+    for fr in all_frames:
         if fr not in frames:
             frames.append(fr)
 
@@ -519,17 +607,7 @@ async def _select_country(page: Page, country_label: str, log: Callable[[str], N
 
 
 async def _has_card_number_input(page: Page) -> bool:
-    selectors = [
-        'input[autocomplete="cc-number"]',
-        'input[aria-label*="Card number"]',
-        'input[placeholder*="Card number"]',
-        'input[name*="cardnumber"]',
-        'input[name*="cardNumber"]',
-        'input[id*="cardNumber"]',
-        'input[aria-label*="卡号"]',
-    ]
-    label_pattern = re.compile(r"card\s*number|卡号", re.I)
-    role_pattern = re.compile(r"card\s*number|卡号", re.I)
+    selectors = NUMBER_SELECTORS
     for frame in page.frames:
         for selector in selectors:
             try:
@@ -539,13 +617,13 @@ async def _has_card_number_input(page: Page) -> bool:
             except Exception:
                 continue
         try:
-            loc = frame.get_by_label(label_pattern).first
+            loc = frame.get_by_label(_LBL_CARD).first
             if await loc.count() > 0 and await loc.is_visible():
                 return True
         except Exception:
             pass
         try:
-            loc = frame.get_by_role("textbox", name=role_pattern).first
+            loc = frame.get_by_role("textbox", name=_LBL_CARD).first
             if await loc.count() > 0 and await loc.is_visible():
                 return True
         except Exception:
@@ -558,13 +636,13 @@ async def _has_card_number_input(page: Page) -> bool:
     except Exception:
         pass
     try:
-        loc = page.get_by_label(label_pattern).first
+        loc = page.get_by_label(_LBL_CARD).first
         if await loc.count() > 0 and await loc.is_visible():
             return True
     except Exception:
         pass
     try:
-        loc = page.get_by_role("textbox", name=role_pattern).first
+        loc = page.get_by_role("textbox", name=_LBL_CARD).first
         if await loc.count() > 0 and await loc.is_visible():
             return True
     except Exception:
@@ -676,7 +754,8 @@ async def _click_add_credit_card(page: Page, log: Callable[[str], None], log_not
         '[role="option"]:has-text("添加卡")',
     ]
 
-    scopes = [page] + _collect_payment_frames(page) + list(page.frames)
+    all_frames = list(page.frames)
+    scopes = [page] + _collect_payment_frames(page, all_frames) + all_frames
     seen = set()
     for scope in scopes:
         sid = id(scope)
@@ -793,7 +872,8 @@ async def _click_accept_button(page: Page, log: Callable[[str], None]) -> bool:
         '[role="button"]:has-text("确认")',
         '[role="button"]:has-text("继续")',
     ]
-    scopes = _collect_payment_frames(page) + list(page.frames) + [page]
+    all_frames = list(page.frames)
+    scopes = _collect_payment_frames(page, all_frames) + all_frames + [page]
     seen = set()
     for scope in scopes:
         sid = id(scope)
@@ -824,6 +904,205 @@ async def _click_accept_button(page: Page, log: Callable[[str], None]) -> bool:
     return False
 
 
+# 命中字段的临时标记属性：页面内找到第一个可见元素后打标，再按标记定位
+# （querySelectorAll 与 Playwright 的 CSS 引擎对 shadow DOM 的处理不同，不能用下标换算成 nth）
+_FIELD_MARK_ATTR = "data-auto-field-hit"
+_field_mark_ids = itertools.count(1)
+
+_FIRST_VISIBLE_JS = """([sel, mark, id]) => {
+    for (const el of document.querySelectorAll(sel)) {
+        const r = el.getBoundingClientRect();
+        if (r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden') {
+            el.setAttribute(mark, id);
+            return true;
+        }
+    }
+    return false;
+}"""
+
+
+# 卡表单各字段的候选选择器（模块级常量，预先拼成组合选择器，每次填卡不再重建）
+NUMBER_SELECTORS = (
+    'input[autocomplete="cc-number"]',
+    'input[aria-label*="Card number"]',
+    'input[placeholder*="Card number"]',
+    'input[name*="cardnumber"]',
+    'input[name*="cardNumber"]',
+    'input[id*="cardNumber"]',
+    'input[aria-label*="卡号"]',
+)
+EXP_SELECTORS = (
+    'input[autocomplete="cc-exp"]',
+    'input[aria-label*="Expiry"]',
+    'input[aria-label*="Expiration"]',
+    'input[aria-label*="MM/YY"]',
+    'input[placeholder*="MM/YY"]',
+    'input[placeholder*="MM"]',
+    'input[placeholder*="YY"]',
+    'input[name*="exp"]',
+    'input[aria-label*="有效期"]',
+)
+CVV_SELECTORS = (
+    'input[autocomplete="cc-csc"]',
+    'input[aria-label*="CVC"]',
+    'input[aria-label*="Security"]',
+    'input[aria-label*="Security code"]',
+    'input[placeholder*="Security code"]',
+    'input[placeholder*="CVC"]',
+    'input[placeholder*="CVV"]',
+    'input[name*="cvc"]',
+    'input[name*="cvv"]',
+    'input[aria-label*="安全码"]',
+)
+ZIP_SELECTORS = (
+    'input[autocomplete="postal-code"]',
+    'input[aria-label*="Billing zip"]',
+    'input[aria-label*="ZIP"]',
+    'input[placeholder*="ZIP"]',
+    'input[aria-label*="Postal"]',
+    'input[placeholder*="Postal"]',
+    'input[name*="postal"]',
+    'input[aria-label*="邮编"]',
+    'input[placeholder*="邮编"]',
+)
+NAME_SELECTORS = (
+    'input[autocomplete="cc-name"]',
+    'input[aria-label*="Cardholder"]',
+    'input[placeholder*="Cardholder"]',
+    'input[aria-label*="Name on card"]',
+    'input[placeholder*="Name on card"]',
+    'input[name*="cardname"]',
+    'input[name*="cardName"]',
+    'input[aria-label*="持卡人"]',
+    'input[placeholder*="持卡人"]',
+    'input[aria-label*="姓名"]',
+)
+ADDRESS_SELECTORS = (
+    'input[autocomplete="address-line1"]',
+    'input[aria-label*="Street"]',
+    'input[placeholder*="Street"]',
+    'input[aria-label*="Address"]',
+    'input[placeholder*="Address"]',
+    'input[name*="address"]',
+    'input[aria-label*="地址"]',
+    'input[placeholder*="地址"]',
+)
+CITY_SELECTORS = (
+    'input[autocomplete="address-level2"]',
+    'input[aria-label*="City"]',
+    'input[placeholder*="City"]',
+    'input[name*="city"]',
+    'input[aria-label*="城市"]',
+    'input[placeholder*="城市"]',
+)
+CITY_SELECT_SELECTORS = (
+    'select[autocomplete="address-level2"]',
+    'select[aria-label*="City"]',
+    'select[name*="city"]',
+)
+STATE_INPUT_SELECTORS = (
+    'input[autocomplete="address-level1"]',
+    'input[aria-label*="State"]',
+    'input[placeholder*="State"]',
+    'input[name*="state"]',
+    'input[aria-label*="省"]',
+    'input[aria-label*="州"]',
+    'input[placeholder*="省"]',
+    'input[placeholder*="州"]',
+)
+STATE_SELECT_SELECTORS = (
+    'select[autocomplete="address-level1"]',
+    'select[aria-label*="State"]',
+    'select[name*="state"]',
+)
+SUBMIT_SELECTORS = (
+    'button:has-text("Save")',
+    'button:has-text("Submit")',
+    'button:has-text("Continue")',
+    'button:has-text("Verify")',
+    'button:has-text("Confirm")',
+    'button:has-text("Next")',
+    'button:has-text("保存")',
+    'button:has-text("提交")',
+    'button:has-text("继续")',
+    'button:has-text("验证")',
+    'button:has-text("确认")',
+    'button:has-text("下一步")',
+    '[role="button"]:has-text("Save")',
+    '[role="button"]:has-text("Continue")',
+    '[role="button"]:has-text("Verify")',
+    '[role="button"]:has-text("Confirm")',
+    '[role="button"]:has-text("继续")',
+    '[role="button"]:has-text("验证")',
+    '[role="button"]:has-text("确认")',
+)
+
+_NUMBER_SEL = ",".join(NUMBER_SELECTORS)
+_EXP_SEL = ",".join(EXP_SELECTORS)
+_CVV_SEL = ",".join(CVV_SELECTORS)
+_ZIP_SEL = ",".join(ZIP_SELECTORS)
+_NAME_SEL = ",".join(NAME_SELECTORS)
+_ADDRESS_SEL = ",".join(ADDRESS_SELECTORS)
+_CITY_SEL = ",".join(CITY_SELECTORS)
+_CITY_SELECT_SEL = ",".join(CITY_SELECT_SELECTORS)
+_STATE_INPUT_SEL = ",".join(STATE_INPUT_SELECTORS)
+_STATE_SELECT_SEL = ",".join(STATE_SELECT_SELECTORS)
+_SUBMIT_SEL = ",".join(SUBMIT_SELECTORS)
+
+# 一次 evaluate 读取输入框当前值（非 input 元素退回 textContent），代替 input_value + evaluate 两次往返
+_READ_VALUE_JS = "el => el ? (el.value ?? el.textContent ?? '') : ''"
+
+_SUBMIT_LABELS = ("Save", "Submit", "Continue", "Verify", "Confirm", "Next", "保存", "提交", "继续", "验证", "确认", "下一步")
+# 按 _SUBMIT_LABELS 优先级在页面内一次找出可见的提交按钮：先文本完全相同，再包含
+_FIND_SUBMIT_JS = """(labels) => {
+    const els = Array.from(document.querySelectorAll('button,[role="button"]'));
+    const visible = (el) => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const texts = els.map((el) => (el.textContent || '').trim().toLowerCase());
+    for (const exact of [true, false]) {
+        for (const label of labels) {
+            const want = label.toLowerCase();
+            for (let i = 0; i < els.length; i++) {
+                const hit = exact ? texts[i] === want : texts[i].includes(want);
+                if (hit && visible(els[i])) return els[i];
+            }
+        }
+    }
+    return null;
+}"""
+
+
+async def _find_submit_button(scope):
+    try:
+        handle = await scope.evaluate_handle(_FIND_SUBMIT_JS, list(_SUBMIT_LABELS))
+    except Exception:
+        return None
+    return handle.as_element() if handle else None
+
+
+async def _first_visible_in(scope, selector: str):
+    """用组合 CSS 选择器查找第一个可见元素：浏览器端一次 evaluate 完成存在+可见判断，命中元素打标后按标记定位"""
+    # 每次查找用独立的标记值，同一 scope 内多个字段的 locator 互不覆盖
+    mark_id = str(next(_field_mark_ids))
+    try:
+        hit = await scope.evaluate(_FIRST_VISIBLE_JS, [selector, _FIELD_MARK_ATTR, mark_id])
+    except Exception:
+        hit = None
+    if hit is None:
+        try:
+            loc = scope.locator(selector).first
+            if await loc.count() > 0 and await loc.is_visible():
+                return loc
+        except Exception:
+            pass
+        return None
+    if not hit:
+        return None
+    return scope.locator(f'[{_FIELD_MARK_ATTR}="{mark_id}"]').first
+
+
 async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Callable[[str], None]) -> bool:
     number = (card_info.get("number") or "").strip()
     mm, yy = _normalize_exp_parts(card_info.get("exp_month", ""), card_info.get("exp_year", ""))
@@ -836,51 +1115,44 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
     state = (card_info.get("state") or "").strip()
     exp = f"{mm}/{yy}" if mm and yy else ""
 
-    number_digits = re.sub(r"\D", "", number)
+    number_digits = _digits_only(number)
 
     if not number_digits or not exp or not cvv:
         log("卡信息不完整，无法进行年龄验证")
         return False
 
-    def _is_netherlands(value: str) -> bool:
-        if not value:
-            return False
-        if value.strip() in {"荷兰", "荷蘭"}:
-            return True
-        low = value.strip().lower()
-        if low in {"nl", "nld"}:
-            return True
-        return any(k in low for k in ["netherlands", "nederland", "holland"])
-
     def _normalize_postal_code(value: str) -> str:
         raw = (value or "").strip()
         if not raw:
             return raw
-        if not _is_netherlands(country):
+        if not is_nl:
             return raw
-        compact = re.sub(r"\s+", "", raw).upper()
-        if re.fullmatch(r"\d{4}[A-Z]{2}", compact):
-            return compact
-        digits = re.sub(r"\D", "", compact)
-        letters = re.sub(r"[^A-Z]", "", compact)
+        # 单次遍历：跳过空白，分别收集数字和（大写）字母；canonical 表示形如 1234AB
+        digit_chars: List[str] = []
+        letter_chars: List[str] = []
+        canonical = True
+        for ch in raw:
+            if ch.isspace():
+                continue
+            if "0" <= ch <= "9":
+                if letter_chars:
+                    canonical = False
+                digit_chars.append(ch)
+            elif ch.isascii() and ch.isalpha():
+                letter_chars.append(ch.upper())
+            else:
+                canonical = False
+        digits = "".join(digit_chars)
+        letters = "".join(letter_chars)
+        if canonical and len(digits) == 4 and len(letters) == 2:
+            return f"{digits}{letters}"
         digits = (digits + "1000")[:4]
         if digits == "0000":
             digits = "1000"
         letters = (letters + "AA")[:2]
         return f"{digits}{letters}"
 
-    country_norm = _normalize_country(country)
-    fallback_city = DEFAULT_CITY
-    fallback_state = DEFAULT_STATE
-    fallback_zip = DEFAULT_ZIP_CODE
-    if country_norm == "China":
-        fallback_city = "Beijing"
-        fallback_state = "Beijing"
-        fallback_zip = "100000"
-    elif _is_netherlands(country):
-        fallback_city = "Amsterdam"
-        fallback_state = "Noord-Holland"
-        fallback_zip = "1234AB"
+    fallback_city, fallback_state, fallback_zip, is_nl = _country_fallbacks(country)
 
     if not zip_code:
         zip_code = fallback_zip
@@ -900,116 +1172,18 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
         log(f"荷兰邮编格式兜底: {zip_code} -> {zip_code_norm}")
         zip_code = zip_code_norm
 
-    number_selectors = [
-        'input[autocomplete="cc-number"]',
-        'input[aria-label*="Card number"]',
-        'input[placeholder*="Card number"]',
-        'input[name*="cardnumber"]',
-        'input[name*="cardNumber"]',
-        'input[id*="cardNumber"]',
-        'input[aria-label*="卡号"]',
-    ]
-    exp_selectors = [
-        'input[autocomplete="cc-exp"]',
-        'input[aria-label*="Expiry"]',
-        'input[aria-label*="Expiration"]',
-        'input[aria-label*="MM/YY"]',
-        'input[placeholder*="MM/YY"]',
-        'input[placeholder*="MM"]',
-        'input[placeholder*="YY"]',
-        'input[name*="exp"]',
-        'input[aria-label*="有效期"]',
-    ]
-    cvv_selectors = [
-        'input[autocomplete="cc-csc"]',
-        'input[aria-label*="CVC"]',
-        'input[aria-label*="Security"]',
-        'input[aria-label*="Security code"]',
-        'input[placeholder*="Security code"]',
-        'input[placeholder*="CVC"]',
-        'input[placeholder*="CVV"]',
-        'input[name*="cvc"]',
-        'input[name*="cvv"]',
-        'input[aria-label*="安全码"]',
-    ]
-    zip_selectors = [
-        'input[autocomplete="postal-code"]',
-        'input[aria-label*="Billing zip"]',
-        'input[aria-label*="ZIP"]',
-        'input[placeholder*="ZIP"]',
-        'input[aria-label*="Postal"]',
-        'input[placeholder*="Postal"]',
-        'input[name*="postal"]',
-        'input[aria-label*="邮编"]',
-        'input[placeholder*="邮编"]',
-    ]
-    name_selectors = [
-        'input[autocomplete="cc-name"]',
-        'input[aria-label*="Cardholder"]',
-        'input[placeholder*="Cardholder"]',
-        'input[aria-label*="Name on card"]',
-        'input[placeholder*="Name on card"]',
-        'input[name*="cardname"]',
-        'input[name*="cardName"]',
-        'input[aria-label*="持卡人"]',
-        'input[placeholder*="持卡人"]',
-        'input[aria-label*="姓名"]',
-    ]
-
-    address_selectors = [
-        'input[autocomplete="address-line1"]',
-        'input[aria-label*="Street"]',
-        'input[placeholder*="Street"]',
-        'input[aria-label*="Address"]',
-        'input[placeholder*="Address"]',
-        'input[name*="address"]',
-        'input[aria-label*="地址"]',
-        'input[placeholder*="地址"]',
-    ]
-    city_selectors = [
-        'input[autocomplete="address-level2"]',
-        'input[aria-label*="City"]',
-        'input[placeholder*="City"]',
-        'input[name*="city"]',
-        'input[aria-label*="城市"]',
-        'input[placeholder*="城市"]',
-    ]
-    city_select_selectors = [
-        'select[autocomplete="address-level2"]',
-        'select[aria-label*="City"]',
-        'select[name*="city"]',
-    ]
-    state_input_selectors = [
-        'input[autocomplete="address-level1"]',
-        'input[aria-label*="State"]',
-        'input[placeholder*="State"]',
-        'input[name*="state"]',
-        'input[aria-label*="省"]',
-        'input[aria-label*="州"]',
-        'input[placeholder*="省"]',
-        'input[placeholder*="州"]',
-    ]
-    state_select_selectors = [
-        'select[autocomplete="address-level1"]',
-        'select[aria-label*="State"]',
-        'select[name*="state"]',
-    ]
-
     warned_missing = {"zip": False, "name": False, "address": False, "city": False, "state": False}
 
     async def safe_fill(loc, value: str, verify_digits: bool = False, delay_ms: int = 30) -> bool:
-        expected = re.sub(r"\D", "", value) if verify_digits else value
+        expected = _digits_only(value) if verify_digits else value
 
         async def get_value() -> str:
             try:
-                cur = await loc.input_value()
+                cur = await loc.evaluate(_READ_VALUE_JS)
             except Exception:
-                try:
-                    cur = await loc.evaluate("el => el && (el.value || '')")
-                except Exception:
-                    cur = ""
+                cur = ""
             cur = cur or ""
-            return re.sub(r"\D", "", cur) if verify_digits else cur
+            return _digits_only(cur) if verify_digits else cur
 
         async def clear() -> None:
             try:
@@ -1023,17 +1197,28 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
             except Exception:
                 pass
 
-        for method, d in (("fill", 0), ("type", delay_ms), ("type", max(delay_ms, 80))):
+        async def is_focused() -> bool:
             try:
-                await loc.scroll_into_view_if_needed()
+                return bool(await loc.evaluate("el => el === document.activeElement"))
             except Exception:
-                pass
-            try:
-                await loc.click(force=True)
-            except Exception:
-                pass
-            await asyncio.sleep(0.15)
-            await clear()
+                return False
+
+        # 先直接 fill 并立即校验（正常路径无等待）；不匹配时才逐字输入重试，重试间隔逐步缩短
+        attempts_done = 0
+        for method, d in (("fill", 0), ("type", delay_ms), ("type", max(delay_ms, 80))):
+            if attempts_done:
+                if not await is_focused():
+                    try:
+                        await loc.scroll_into_view_if_needed()
+                    except Exception:
+                        pass
+                    try:
+                        await loc.click(force=True)
+                    except Exception:
+                        pass
+                await asyncio.sleep(0.15 if attempts_done == 1 else 0.05)
+                await clear()
+            attempts_done += 1
             try:
                 if method == "fill":
                     await loc.fill(value)
@@ -1041,32 +1226,31 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                     await loc.type(value, delay=d)
             except Exception:
                 continue
-            await asyncio.sleep(0.2)
             cur = await get_value()
             if cur == expected:
                 return True
         return False
 
     async def try_fill(scope) -> bool:
-        card_number_input = None
-        for selector in number_selectors:
-            try:
-                loc = scope.locator(selector).first
-                if await loc.count() > 0 and await loc.is_visible():
-                    card_number_input = loc
-                    break
-            except Exception:
-                continue
+        found: Dict[str, object] = {}
+
+        async def lookup(key: str, selector: str):
+            # 同一 scope 内每个字段只查一次 DOM，缺失字段的告警分支直接复用结果
+            if key not in found:
+                found[key] = await _first_visible_in(scope, selector)
+            return found[key]
+
+        card_number_input = await lookup("number", _NUMBER_SEL)
         if not card_number_input:
             try:
-                loc = scope.get_by_label(re.compile(r"card\s*number|卡号", re.I)).first
+                loc = scope.get_by_label(_LBL_CARD).first
                 if await loc.count() > 0 and await loc.is_visible():
                     card_number_input = loc
             except Exception:
                 pass
         if not card_number_input:
             try:
-                loc = scope.get_by_role("textbox", name=re.compile(r"card\s*number|卡号", re.I)).first
+                loc = scope.get_by_role("textbox", name=_LBL_CARD).first
                 if await loc.count() > 0 and await loc.is_visible():
                     card_number_input = loc
             except Exception:
@@ -1078,25 +1262,17 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
             return False
 
         filled_exp = False
-        exp_input = None
-        for selector in exp_selectors:
-            try:
-                loc = scope.locator(selector).first
-                if await loc.count() > 0 and await loc.is_visible():
-                    exp_input = loc
-                    break
-            except Exception:
-                continue
+        exp_input = await lookup("exp", _EXP_SEL)
         if not exp_input:
             try:
-                loc = scope.get_by_placeholder(re.compile(r"mm/yy", re.I)).first
+                loc = scope.get_by_placeholder(_PH_MMYY).first
                 if await loc.count() > 0 and await loc.is_visible():
                     exp_input = loc
             except Exception:
                 pass
         if not exp_input:
             try:
-                loc = scope.get_by_role("textbox", name=re.compile(r"mm/yy|expir|有效期", re.I)).first
+                loc = scope.get_by_role("textbox", name=_LBL_EXP).first
                 if await loc.count() > 0 and await loc.is_visible():
                     exp_input = loc
             except Exception:
@@ -1117,25 +1293,17 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
             return False
 
         filled_cvv = False
-        cvv_input = None
-        for selector in cvv_selectors:
-            try:
-                loc = scope.locator(selector).first
-                if await loc.count() > 0 and await loc.is_visible():
-                    cvv_input = loc
-                    break
-            except Exception:
-                continue
+        cvv_input = await lookup("cvv", _CVV_SEL)
         if not cvv_input:
             try:
-                loc = scope.get_by_placeholder(re.compile(r"security\s*code|cvc|cvv", re.I)).first
+                loc = scope.get_by_placeholder(_PH_CVV).first
                 if await loc.count() > 0 and await loc.is_visible():
                     cvv_input = loc
             except Exception:
                 pass
         if not cvv_input:
             try:
-                loc = scope.get_by_role("textbox", name=re.compile(r"security\s*code|cvc|cvv|安全码", re.I)).first
+                loc = scope.get_by_role("textbox", name=_LBL_CVV).first
                 if await loc.count() > 0 and await loc.is_visible():
                     cvv_input = loc
             except Exception:
@@ -1146,16 +1314,17 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
         if cvv and not filled_cvv:
             return False
 
+        # 邮编/持卡人/地址输入框一开始就在表单里，先并发查找（只读 DOM）；写入仍串行，避免多个输入框争抢键盘焦点。
+        # 城市/省州字段常在填完邮编、地址后才出现，留到用到时再查
+        await asyncio.gather(
+            lookup("zip", _ZIP_SEL),
+            lookup("name", _NAME_SEL),
+            lookup("address", _ADDRESS_SEL),
+            return_exceptions=True,
+        )
+
         if zip_code:
-            zip_input = None
-            for selector in zip_selectors:
-                try:
-                    loc = scope.locator(selector).first
-                    if await loc.count() > 0 and await loc.is_visible():
-                        zip_input = loc
-                        break
-                except Exception:
-                    continue
+            zip_input = await lookup("zip", _ZIP_SEL)
             if zip_input:
                 try:
                     await zip_input.click(force=True)
@@ -1166,26 +1335,11 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                     except Exception:
                         pass
         else:
-            if not warned_missing["zip"]:
-                try:
-                    for selector in zip_selectors:
-                        loc = scope.locator(selector).first
-                        if await loc.count() > 0 and await loc.is_visible():
-                            log("检测到邮编输入框，但卡信息未提供 zip_code")
-                            warned_missing["zip"] = True
-                            break
-                except Exception:
-                    pass
+            if not warned_missing["zip"] and await lookup("zip", _ZIP_SEL):
+                log("检测到邮编输入框，但卡信息未提供 zip_code")
+                warned_missing["zip"] = True
         if holder_name:
-            name_input = None
-            for selector in name_selectors:
-                try:
-                    loc = scope.locator(selector).first
-                    if await loc.count() > 0 and await loc.is_visible():
-                        name_input = loc
-                        break
-                except Exception:
-                    continue
+            name_input = await lookup("name", _NAME_SEL)
             if name_input:
                 try:
                     await name_input.click(force=True)
@@ -1196,27 +1350,12 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                     except Exception:
                         pass
         else:
-            if not warned_missing["name"]:
-                try:
-                    for selector in name_selectors:
-                        loc = scope.locator(selector).first
-                        if await loc.count() > 0 and await loc.is_visible():
-                            log("检测到持卡人输入框，但卡信息未提供 holder_name")
-                            warned_missing["name"] = True
-                            break
-                except Exception:
-                    pass
+            if not warned_missing["name"] and await lookup("name", _NAME_SEL):
+                log("检测到持卡人输入框，但卡信息未提供 holder_name")
+                warned_missing["name"] = True
 
+        address_input = await lookup("address", _ADDRESS_SEL)
         if address:
-            address_input = None
-            for selector in address_selectors:
-                try:
-                    loc = scope.locator(selector).first
-                    if await loc.count() > 0 and await loc.is_visible():
-                        address_input = loc
-                        break
-                except Exception:
-                    continue
             if address_input:
                 try:
                     await address_input.click(force=True)
@@ -1227,15 +1366,6 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                     except Exception:
                         pass
         else:
-            address_input = None
-            for selector in address_selectors:
-                try:
-                    loc = scope.locator(selector).first
-                    if await loc.count() > 0 and await loc.is_visible():
-                        address_input = loc
-                        break
-                except Exception:
-                    continue
             if address_input:
                 fallback = ((city or state or "").strip() + " 1st Street").strip()
                 if not fallback:
@@ -1255,15 +1385,7 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                 warned_missing["address"] = True
 
         if city:
-            city_input = None
-            for selector in city_selectors:
-                try:
-                    loc = scope.locator(selector).first
-                    if await loc.count() > 0 and await loc.is_visible():
-                        city_input = loc
-                        break
-                except Exception:
-                    continue
+            city_input = await lookup("city", _CITY_SEL)
             if city_input:
                 try:
                     await city_input.click(force=True)
@@ -1274,15 +1396,7 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                     except Exception:
                         pass
             else:
-                city_select = None
-                for selector in city_select_selectors:
-                    try:
-                        sel = scope.locator(selector).first
-                        if await sel.count() > 0 and await sel.is_visible():
-                            city_select = sel
-                            break
-                    except Exception:
-                        continue
+                city_select = await lookup("city_select", _CITY_SELECT_SEL)
                 if city_select:
                     try:
                         await city_select.select_option(label=city)
@@ -1298,37 +1412,23 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                                 except Exception:
                                     continue
         else:
-            if not warned_missing["city"]:
-                try:
-                    for selector in city_selectors:
-                        loc = scope.locator(selector).first
-                        if await loc.count() > 0 and await loc.is_visible():
-                            log("检测到城市输入框，但卡信息未提供 city")
-                            warned_missing["city"] = True
-                            break
-                except Exception:
-                    pass
+            if not warned_missing["city"] and await lookup("city", _CITY_SEL):
+                log("检测到城市输入框，但卡信息未提供 city")
+                warned_missing["city"] = True
 
         if state:
             filled_state = False
-            state_select = None
-            for selector in state_select_selectors:
+            state_select = await lookup("state_select", _STATE_SELECT_SEL)
+            if state_select:
                 try:
-                    sel = scope.locator(selector).first
-                    if await sel.count() > 0 and await sel.is_visible():
-                        state_select = sel
-                        try:
-                            await sel.select_option(label=state)
-                            filled_state = True
-                        except Exception:
-                            try:
-                                await sel.select_option(value=state)
-                                filled_state = True
-                            except Exception:
-                                filled_state = False
-                        break
+                    await state_select.select_option(label=state)
+                    filled_state = True
                 except Exception:
-                    continue
+                    try:
+                        await state_select.select_option(value=state)
+                        filled_state = True
+                    except Exception:
+                        filled_state = False
             if not filled_state and state_select:
                 for idx in (1, 0):
                     try:
@@ -1339,15 +1439,7 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                     except Exception:
                         continue
             if not filled_state:
-                state_input = None
-                for selector in state_input_selectors:
-                    try:
-                        loc = scope.locator(selector).first
-                        if await loc.count() > 0 and await loc.is_visible():
-                            state_input = loc
-                            break
-                    except Exception:
-                        continue
+                state_input = await lookup("state_input", _STATE_INPUT_SEL)
                 if state_input:
                     try:
                         await state_input.click(force=True)
@@ -1360,63 +1452,54 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
                         except Exception:
                             pass
         else:
-            if not warned_missing["state"]:
-                try:
-                    for selector in state_select_selectors + state_input_selectors:
-                        loc = scope.locator(selector).first
-                        if await loc.count() > 0 and await loc.is_visible():
-                            log("检测到省/州输入框，但卡信息未提供 state")
-                            warned_missing["state"] = True
-                            break
-                except Exception:
-                    pass
-
-        if cvv_input:
+            if not warned_missing["state"] and (
+                await lookup("state_select", _STATE_SELECT_SEL) or await lookup("state_input", _STATE_INPUT_SEL)
+            ):
+                log("检测到省/州输入框，但卡信息未提供 state")
+                warned_missing["state"] = True
+
+        # safe_fill 已校验过 CVV；只有之后又写了其他输入框（表单可能重绘清空 CVV）才需要复查
+        cvv_verified = filled_cvv and not any(
+            found.get(k) for k in ("zip", "name", "address", "city", "city_select", "state_select", "state_input")
+        )
+        if cvv_input and not cvv_verified:
             try:
-                cur = await cvv_input.input_value()
+                cur = await cvv_input.evaluate(_READ_VALUE_JS)
             except Exception:
-                try:
-                    cur = await cvv_input.evaluate("el => el && (el.value || '')")
-                except Exception:
-                    cur = ""
-            if not re.sub(r"\D", "", (cur or "")):
+                cur = ""
+            if not _digits_only(cur):
                 try:
                     await safe_fill(cvv_input, cvv, verify_digits=True, delay_ms=35)
                 except Exception:
                     pass
 
-        submit_selectors = [
-            'button:has-text("Save")',
-            'button:has-text("Submit")',
-            'button:has-text("Continue")',
-            'button:has-text("Verify")',
-            'button:has-text("Confirm")',
-            'button:has-text("Next")',
-            'button:has-text("保存")',
-            'button:has-text("提交")',
-            'button:has-text("继续")',
-            'button:has-text("验证")',
-            'button:has-text("确认")',
-            'button:has-text("下一步")',
-            '[role="button"]:has-text("Save")',
-            '[role="button"]:has-text("Continue")',
-            '[role="button"]:has-text("Verify")',
-            '[role="button"]:has-text("Confirm")',
-            '[role="button"]:has-text("继续")',
-            '[role="button"]:has-text("验证")',
-            '[role="button"]:has-text("确认")',
-        ]
-        for selector in submit_selectors:
+        submit_el = await _find_submit_button(scope)
+        if submit_el:
             try:
-                btn = scope.locator(selector).first
-                if await btn.count() > 0 and await btn.is_visible():
-                    await btn.scroll_into_view_if_needed()
-                    await btn.click(force=True)
-                    log(f"点击提交按钮: {selector}")
-                    await asyncio.sleep(2)
-                    return True
+                label = ((await submit_el.text_content()) or "").strip()
+                await submit_el.scroll_into_view_if_needed()
+                await submit_el.click(force=True)
+                log(f"点击提交按钮: {label or 'submit'}")
+                await asyncio.sleep(2)
+                return True
             except Exception:
-                continue
+                pass
+
+        # 页面内查找失败（如按钮在 shadow DOM 中）时回退到 Playwright 组合选择器
+        try:
+            btn = scope.locator(_SUBMIT_SEL).locator("visible=true").first
+            if await btn.count() > 0:
+                await btn.scroll_into_view_if_needed()
+                try:
+                    label = ((await btn.text_content()) or "").strip()
+                except Exception:
+                    label = ""
+                await btn.click(force=True)
+                log(f"点击提交按钮: {label or 'submit'}")
+                await asyncio.sleep(2)
+                return True
+        except Exception:
+            pass
 
         try:
             await card_number_input.press("Enter")
@@ -1425,20 +1508,14 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
         except Exception:
             return True
 
-    scopes = _collect_payment_frames(page) + list(page.frames) + [page]
-    seen = set()
-    for scope in scopes:
-        sid = id(scope)
-        if sid in seen:
-            continue
-        seen.add(sid)
+    for scope in _card_form_scopes(page):
         if await try_fill(scope):
             return True
 
     # 调试信息（仅失败时输出一次）
     try:
         frames = list(page.frames)
-        payment_frames = _collect_payment_frames(page)
+        payment_frames = _collect_payment_frames(page, frames)
         sample_urls = []
         for fr in payment_frames[:3]:
             try:
@@ -1451,41 +1528,32 @@ async def _fill_card_form_legacy(page: Page, card_info: Dict[str, str], log: Cal
     return False
 
 
-async def auto_age_verification(page: Page, card_info: Dict[str, str], log: Callable[[str], None]) -> Tuple[bool, str, bool]:
-    verified_phrases = [
-        "You're all set",
-        "You’re all set",
-        "You are all set",
-        "all set",
-        "Your age has been verified",
-        "age has been verified",
-        "Age verified",
-        "Your age is verified",
-        "You've already verified your age",
-        "You’ve already verified your age",
-        "Thank you for confirming you’re old enough to use certain Google services",
-        "您的年龄已验证",
-        "你的年齡已驗證",
-        "已完成",
-        "完成",
-    ]
-    need_verify_phrases = [
-        "Verify your age",
-        "Confirm your age",
-        "Age verification required",
-        "验证您的年龄",
-        "确认您的年龄",
-        "驗證你的年齡",
-        "確認你的年齡",
-    ]
+VERIFIED_PHRASES = [
+    "You're all set",
+    "You’re all set",
+    "You are all set",
+    "all set",
+    "Your age has been verified",
+    "age has been verified",
+    "Age verified",
+    "Your age is verified",
+    "You've already verified your age",
+    "You’ve already verified your age",
+    "Thank you for confirming you’re old enough to use certain Google services",
+    "您的年龄已验证",
+    "你的年齡已驗證",
+    "已完成",
+    "完成",
+]
+_VERIFIED_RE = re.compile("|".join(re.escape(p) for p in VERIFIED_PHRASES), re.I)
+
+
+def _contains_any(text: str, pattern: re.Pattern) -> Optional[str]:
+    m = pattern.search(text or "")
+    return m.group(0) if m else None
 
-    def _contains_any(text: str, phrases: List[str]) -> Optional[str]:
-        low = (text or "").lower()
-        for phrase in phrases:
-            if (phrase or "").lower() in low:
-                return phrase
-        return None
 
+async def auto_age_verification(page: Page, card_info: Dict[str, str], log: Callable[[str], None]) -> Tuple[bool, str, bool]:
     keep_open = True
     try:
         log(f"[age_verify] rev={AGE_VERIFICATION_SERVICE_REV} file={__file__}")
@@ -1508,7 +1576,7 @@ async def auto_age_verification(page: Page, card_info: Dict[str, str], log: Call
     except Exception:
         body_text = ""
 
-    hit = _contains_any(body_text, verified_phrases)
+    hit = _contains_any(body_text, _VERIFIED_RE)
     if hit:
         try:
             card_info["__age_verify_used_card"] = False
@@ -1525,6 +1593,61 @@ async def auto_age_verification(page: Page, card_info: Dict[str, str], log: Call
     return ok2, msg2, True
 
 
+def _write_file(path: str, data) -> None:
+    mode = "wb" if isinstance(data, bytes) else "w"
+    encoding = None if isinstance(data, bytes) else "utf-8"
+    with open(path, mode, encoding=encoding) as f:
+        f.write(data)
+
+
+async def _dump_failure_debug(page: Page, browser_id: str, msg: str, log: Callable[[str], None]) -> str:
+    """失败时保存截图、页面 HTML 及支付 iframe HTML；CDP 抓取并发进行，写盘放到线程池，不阻塞事件循环"""
+    try:
+        debug_dir = os.path.join(tempfile.gettempdir(), "auto_all_system_age_verify")
+        os.makedirs(debug_dir, exist_ok=True)
+        prefix = os.path.join(debug_dir, f"age_verify_{browser_id[:8]}_{int(time.time())}")
+        screenshot_path = f"{prefix}.png"
+        html_path = f"{prefix}.html"
+
+        # page.content 不包含 iframe 内部 DOM，额外保存关键 iframe 的 HTML
+        frames = [(idx, fr) for idx, fr in enumerate(page.frames) if _looks_payment(fr.url)]
+        results = await asyncio.gather(
+            page.screenshot(),
+            page.content(),
+            *(fr.content() for _, fr in frames),
+            return_exceptions=True,
+        )
+        shot, html, frame_htmls = results[0], results[1], results[2:]
+
+        writes = []
+        if not isinstance(shot, BaseException):
+            writes.append((screenshot_path, shot))
+        if not isinstance(html, BaseException):
+            writes.append((html_path, html))
+        for (idx, _), html2 in zip(frames, frame_htmls):
+            if not isinstance(html2, BaseException):
+                writes.append((f"{prefix}_frame{idx}.html", html2))
+        written = await asyncio.gather(
+            *(asyncio.to_thread(_write_file, path, data) for path, data in writes),
+            return_exceptions=True,
+        )
+        saved = {path for (path, _), r in zip(writes, written) if not isinstance(r, BaseException)}
+
+        if screenshot_path in saved:
+            log(f"失败截图: {screenshot_path}")
+            if html_path in saved:
+                log(f"失败HTML: {html_path}")
+                msg = f"{msg} | 截图: {screenshot_path} | HTML: {html_path}"
+            else:
+                msg = f"{msg} | 截图: {screenshot_path}"
+        dumped = len(saved - {screenshot_path, html_path})
+        if dumped:
+            log(f"失败FrameHTML: {dumped} 个（payments/pay/tokenized）")
+    except Exception:
+        pass
+    return msg
+
+
 def process_age_verification(
     browser_id: str,
     card_info: Optional[dict] = None,
@@ -1605,49 +1728,7 @@ def process_age_verification(
                 if ok and card_id and used_card:
                     update_card_usage(card_id)
                 if not ok:
-                    try:
-                        debug_dir = os.path.join(tempfile.gettempdir(), "auto_all_system_age_verify")
-                        os.makedirs(debug_dir, exist_ok=True)
-                        screenshot_path = os.path.join(
-                            debug_dir, f"age_verify_{browser_id[:8]}_{int(time.time())}.png"
-                        )
-                        await page.screenshot(path=screenshot_path)
-                        log(f"失败截图: {screenshot_path}")
-                        html_path = os.path.join(
-                            debug_dir, f"age_verify_{browser_id[:8]}_{int(time.time())}.html"
-                        )
-                        try:
-                            html = await page.content()
-                            with open(html_path, "w", encoding="utf-8") as f:
-                                f.write(html)
-                            log(f"失败HTML: {html_path}")
-                            msg = f"{msg} | 截图: {screenshot_path} | HTML: {html_path}"
-                        except Exception:
-                            msg = f"{msg} | 截图: {screenshot_path}"
-
-                        # 额外保存关键 iframe 的 HTML（page.content 不包含 iframe 内部 DOM）
-                        try:
-                            dumped = 0
-                            for idx, fr in enumerate(page.frames):
-                                u = (fr.url or "")
-                                if "payments.google.com" not in u and "pay.google.com" not in u and "tokenized.play.google.com" not in u:
-                                    continue
-                                frame_html_path = os.path.join(
-                                    debug_dir, f"age_verify_{browser_id[:8]}_{int(time.time())}_frame{idx}.html"
-                                )
-                                try:
-                                    html2 = await fr.content()
-                                    with open(frame_html_path, "w", encoding="utf-8") as f:
-                                        f.write(html2)
-                                    dumped += 1
-                                except Exception:
-                                    continue
-                            if dumped:
-                                log(f"失败FrameHTML: {dumped} 个（payments/pay/tokenized）")
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
+                    msg = await _dump_failure_debug(page, browser_id, msg, log)
                 return ok, msg, keep_open
         except Exception as e:
             return False, str(e), True
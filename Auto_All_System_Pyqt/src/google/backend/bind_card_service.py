@@ -4,27 +4,319 @@
 @details 自动绑定测试卡并完成Google One订阅
 """
 import asyncio
+import atexit
+import concurrent.futures
 import re
+import threading
 import time
+import weakref
 from typing import Tuple, Optional, Callable
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import async_playwright, Frame, Page
+
+try:
+    from core.database import DBManager
+except Exception:
+    DBManager = None
+
+
+_EXP_RE = re.compile(r"(\d{1,2})\s*[/\-]\s*(\d{2,4})")
+# str.translate 删除表：一次 C 层遍历去掉非数字（仅覆盖 Latin-1，其余字符逐个判断兜底）
+_NON_DIGIT_DEL = str.maketrans("", "", "".join(chr(c) for c in range(256) if not chr(c).isdigit()))
+_ALREADY_SUBSCRIBED_SEL = 'text=/already\\s+subscribed/i'
+# Step 6 订阅按钮名称：单个交替正则，一次匹配代替逐个模式尝试
+_SUB_NAME_RE = re.compile(
+    r"^\s*(?:Subscribe(?:\s+now)?|Start\s+(?:subscription|plan)|Continue|订阅|立即订阅|开始订阅|继续)\s*$",
+    re.I,
+)
+
+# 各步骤按钮选择器：模块级元组 + 逗号并集，一次 locator 匹配代替逐个 count
+DIRECT_SUBSCRIBE_SELECTORS = (
+    'button:has-text("Subscribe")',
+    'button:has-text("Subscribe now")',
+    '[role="button"]:has-text("Subscribe")',
+    'button:has-text("订阅")',
+    'button:has-text("立即订阅")',
+    '[role="button"]:has-text("订阅")',
+)
+# Add card / Save card 按优先级逐个尝试（并集取 .first 是按 DOM 顺序，宽泛的备选可能抢在具体按钮前）
+ADD_CARD_SELECTORS = (
+    'span.PjwEQ:has-text("Add card")',
+    ':text("Add card")',
+)
+SAVE_CARD_SELECTORS = (
+    'button:has-text("Save card")',
+    'button:has-text("Save")',
+)
+SUBSCRIBE_SELECTORS = (
+    'button:has-text("Subscribe")',
+    'button:has-text("Subscribe now")',
+    'button:has-text("Start subscription")',
+    'button:has-text("Start plan")',
+    'button:has-text("Continue")',
+    'button:has-text("订阅")',
+    'button:has-text("立即订阅")',
+    'button:has-text("开始订阅")',
+    'button:has-text("继续")',
+)
+SUBMIT_FALLBACK_SELECTORS = (
+    'button[type="submit"]',
+    'button.VfPpkd-LgbsSe-OWXEXe-k8QpJ',
+    'button.VfPpkd-LgbsSe',
+    '[role="button"][type="submit"]',
+)
+_DIRECT_SUBSCRIBE_SEL = ", ".join(DIRECT_SUBSCRIBE_SELECTORS)
+_SUBSCRIBE_SEL = ", ".join(SUBSCRIBE_SELECTORS)
+_SUBMIT_FALLBACK_SEL = ", ".join(SUBMIT_FALLBACK_SELECTORS)
+
+# Step 6 每帧一次 evaluate 列出可点击按钮（有弹窗时只看弹窗内），并打上序号标记便于回点
+_SUBSCRIBE_MARK_ATTR = "data-bindcard-sub"
+_SUBSCRIBE_SCAN_JS = """attr => {
+    document.querySelectorAll('[' + attr + ']').forEach(e => e.removeAttribute(attr));
+    const all = Array.from(document.querySelectorAll('button, [role="button"]'));
+    const inDialog = all.filter(e => e.closest('[role="dialog"], dialog'));
+    const hasDialog = document.querySelector('[role="dialog"], dialog') !== null;
+    const pool = hasDialog ? inDialog : all;
+    const out = [];
+    pool.forEach((e, i) => {
+        const r = e.getBoundingClientRect();
+        if (!(r.width > 0 && r.height > 0) || getComputedStyle(e).visibility === 'hidden') return;
+        if (e.disabled || e.getAttribute('aria-disabled') === 'true') return;
+        const name = (e.getAttribute('aria-label') || e.innerText || e.textContent || '').replace(/\\s+/g, ' ').trim();
+        if (!name || name.length > 40) return;
+        e.setAttribute(attr, String(i));
+        out.push({idx: i, name, x: r.x, y: r.y, w: r.width, h: r.height, tag: e.tagName, cls: String(e.className || '')});
+    });
+    return out;
+}"""
+
+
+def _button_score(meta: dict) -> float:
+    """按位置（越靠右下越优先）、面积、标签与 Material 按钮样式给候选按钮打分"""
+    x = meta.get("x", 0) or 0
+    y = meta.get("y", 0) or 0
+    w = meta.get("w", 0) or 0
+    h = meta.get("h", 0) or 0
+    score = (y + h) * 1_000_000_000 + (x + w) * 1_000_000 + w * h
+    if (meta.get("tag") or "").upper() == "BUTTON":
+        score += 50_000
+    if "VfPpkd-LgbsSe" in (meta.get("cls") or ""):
+        score += 100_000
+    return score
+
+
+async def _click_with_fallback(target) -> bool:
+    """普通点击 -> 强制点击 -> DOM click() 逐级兜底"""
+    try:
+        await target.click(timeout=5000)
+        return True
+    except Exception:
+        try:
+            await target.click(force=True, timeout=3000)
+            return True
+        except Exception:
+            try:
+                await target.evaluate("el => el.click()")
+                return True
+            except Exception:
+                return False
+
+
+async def _click_subscribe_in(scope) -> bool:
+    """在单个 frame 内一次性扫描订阅按钮候选，Python 侧匹配名称与打分后只点击胜出者"""
+    try:
+        metas = await scope.evaluate(_SUBSCRIBE_SCAN_JS, _SUBSCRIBE_MARK_ATTR)
+    except Exception:
+        return False
+    cands = [m for m in metas or [] if _SUB_NAME_RE.match(m.get("name") or "")]
+    if not cands:
+        return False
+    best = max(cands, key=_button_score)
+    return await _click_with_fallback(scope.locator(f'[{_SUBSCRIBE_MARK_ATTR}="{best["idx"]}"]').first)
+
+
+# 一次读回所有候选按钮的可见性、可用性、位置与样式，供 _button_score 打分
+_BUTTON_META_JS = """els => els.map(e => {
+    const r = e.getBoundingClientRect();
+    return {
+        visible: r.width > 0 && r.height > 0 && getComputedStyle(e).visibility !== 'hidden',
+        enabled: !e.disabled && e.getAttribute('aria-disabled') !== 'true',
+        x: r.x, y: r.y, w: r.width, h: r.height,
+        tag: e.tagName,
+        cls: String(e.className || ''),
+    };
+})"""
+
+
+async def _click_best(locator) -> bool:
+    """在 locator 的全部匹配中挑选得分最高的可见可用按钮并点击（元数据一次 evaluate_all 读回）"""
+    try:
+        metas = await locator.evaluate_all(_BUTTON_META_JS)
+    except Exception:
+        return False
+    ranked = [(idx, m) for idx, m in enumerate(metas or []) if m.get("visible") and m.get("enabled")]
+    if not ranked:
+        return False
+    best_idx = max(ranked, key=lambda item: _button_score(item[1]))[0]
+    best = locator.nth(best_idx)
+    try:
+        await best.scroll_into_view_if_needed()
+    except Exception:
+        pass
+    return await _click_with_fallback(best)
+
+
+_PAYMENT_FRAME_URL_KEYS = ("tokenized.play.google.com", "payments.google.com", "pay.google.com", "instrumentmanager", "payment")
+_PAYMENT_FRAME_NAME_KEYS = ("paymentsmodaliframe", "ucc-", "hnynzeiframe")
+
+
+def _subscribe_scopes(page: Page) -> list:
+    """支付相关 frame 优先，其余 frame 按原顺序随后（主 frame 即页面本身）"""
+    seen = set()
+    ranked = []
+    for order, frame in enumerate(page.frames):
+        fid = id(frame)
+        if fid in seen:
+            continue
+        seen.add(fid)
+        url = (frame.url or "").lower()
+        name = (frame.name or "").lower()
+        is_payment = any(k in url for k in _PAYMENT_FRAME_URL_KEYS) or any(k in name for k in _PAYMENT_FRAME_NAME_KEYS)
+        ranked.append((0 if is_payment else 1, order, frame))
+    ranked.sort(key=lambda item: item[:2])
+    return [frame for _, _, frame in ranked]
+
+
+# 订阅下单接口特征：拒付/失败的订单同样返回 200，响应只作为"立即复查订阅状态"的信号
+_SUBSCRIBE_DONE_MARKERS = ("confirmSubscription", "submitOrder")
+
+# 订阅成功标志（CSS 并集一次匹配；Playwright 文本匹配会规整空白，:text 为不区分大小写的子串匹配）
+_SUBSCRIBED_SEL = ':text("Subscribed"), :text("已订阅"), :text-matches("manage plan", "i")'
+
+
+_TARGET_URL_PREFIX = "https://one.google.com/ai-student"
+
+# Google One 学生页面加载到可操作状态的标志：头像/登录框/资格区块/付款 iframe/已订阅文案任一出现
+_LANDING_READY_SEL = (
+    'a[aria-label*="Google"] img, input[type="email"], [jsname="hSRGPd"], [jsname="V67aGc"], '
+    'iframe[src*="tokenized.play.google.com"], ' + _SUBSCRIBED_SEL
+)
+
+
+async def _wait_landing_ready(page: Page, timeout: int = 8000):
+    """导航后等待页面关键元素出现（替代固定 sleep；超时不报错，交由后续步骤自行等待）"""
+    try:
+        await page.wait_for_selector(_LANDING_READY_SEL, timeout=timeout)
+    except Exception:
+        pass
+
+
+async def _content_frame(parent, selector: str):
+    """解析 iframe 元素对应的 Frame，解析一次后复用（frame_locator 每次使用都要重新匹配选择器）"""
+    try:
+        el = await parent.query_selector(selector)
+        return await el.content_frame() if el else None
+    except Exception:
+        return None
+
+
+async def _first_ready(waits: dict) -> Optional[str]:
+    """并发等待多个 wait_for_selector 协程，返回最先成功者的 key；全部失败/超时返回 None"""
+    tasks = {asyncio.ensure_future(aw): key for key, aw in waits.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    return tasks[task]
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _wait_subscribed(page: Page, account_info: dict, timeout: float) -> Tuple[bool, str]:
+    """在所有 frame 上并发等待订阅成功标志，命中后用 _check_subscription_status 确认并落库"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        # 分段等待，期间新出现的 frame 在下一段纳入
+        chunk_ms = int(max(1.0, min(10.0, deadline - time.time())) * 1000)
+        hit = await _first_ready({
+            idx: frame.wait_for_selector(_SUBSCRIBED_SEL, state="attached", timeout=chunk_ms)
+            for idx, frame in enumerate(page.frames)
+        })
+        if hit is not None:
+            ok, msg = await _check_subscription_status(page, account_info)
+            if ok:
+                return True, msg
+        await asyncio.sleep(0.5)
+    return await _check_subscription_status(page, account_info)
+
+
+# 一次读回所有输入框的提示属性、可见性和当前值，避免逐个 get_attribute/is_visible/input_value
+_INPUT_META_JS = """els => els.map(e => {
+    const r = e.getBoundingClientRect();
+    const attrs = ['aria-label', 'placeholder', 'name', 'autocomplete'].map(a => e.getAttribute(a) || '');
+    return {
+        hint: attrs.join(' '),
+        visible: r.width > 0 && r.height > 0 && getComputedStyle(e).visibility !== 'hidden',
+        value: e.value || '',
+    };
+})"""
+
+
+async def _input_metas(inputs) -> list:
+    try:
+        return await inputs.evaluate_all(_INPUT_META_JS)
+    except Exception:
+        return []
+
+
+# 卡号/有效期/CVV 快速写入：原生 value setter + input/change/blur 事件；是否生效由调用方稍后用 input_value() 回读判断
+_BATCH_FILL_JS = """(els, vals) => {
+    const setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+    els.slice(0, vals.length).forEach((e, i) => {
+        e.focus();
+        setter.call(e, vals[i]);
+        e.dispatchEvent(new Event('input', {bubbles: true}));
+        e.dispatchEvent(new Event('change', {bubbles: true}));
+        e.blur();
+    });
+}"""
+
+
+def _digits_only(value: str) -> str:
+    digits = (value or "").translate(_NON_DIGIT_DEL)
+    if digits.isascii():
+        return digits
+    return "".join(ch for ch in digits if ch.isdigit())
 
 
 def _normalize_exp_parts(exp_month: str, exp_year: str) -> Tuple[str, str]:
     raw_month = (exp_month or "").strip()
     raw_year = (exp_year or "").strip()
 
+    # 已是规范 MM/YY（如数据库卡片再次归一化）时直接返回
+    if (
+        len(raw_month) == 2 and raw_month.isdigit()
+        and len(raw_year) == 2 and raw_year.isdigit()
+        and 1 <= int(raw_month) <= 12
+    ):
+        return raw_month, raw_year
+
     if not raw_year and raw_month:
-        m = re.search(r"(\d{1,2})\s*[/\-]\s*(\d{2,4})", raw_month)
+        m = _EXP_RE.search(raw_month)
         if m:
             raw_month, raw_year = m.group(1), m.group(2)
     elif not raw_month and raw_year:
-        m = re.search(r"(\d{1,2})\s*[/\-]\s*(\d{2,4})", raw_year)
+        m = _EXP_RE.search(raw_year)
         if m:
             raw_month, raw_year = m.group(1), m.group(2)
 
-    mm = "".join(ch for ch in raw_month if ch.isdigit())
-    yy = "".join(ch for ch in raw_year if ch.isdigit())
+    mm = _digits_only(raw_month)
+    yy = _digits_only(raw_year)
 
     if not yy:
         if len(mm) == 4:
@@ -47,26 +339,79 @@ def _normalize_exp_parts(exp_month: str, exp_year: str) -> Tuple[str, str]:
     return mm, yy
 
 
+def _mark_subscribed(email: str, status: str = "subscribed"):
+    """
+    @brief 将账号订阅状态写入数据库（失败仅忽略，不影响绑卡结果）
+    @param email 账号邮箱
+    @param status 订阅状态
+    """
+    if DBManager is None or not email:
+        return
+    try:
+        DBManager.update_account_status(email, status)
+    except Exception:
+        pass
+
+
+# 可用卡片短时缓存：并发绑卡时共用一次查询结果（只读元组，和直接查库一样取第一张）
+# 锁按事件循环区分：asyncio.Lock 不能跨事件循环使用，而绑卡既会跑在共享 Runtime 上也会被 asyncio.run 调用
+_CARD_CACHE_TTL = 2.0
+_card_cache = {"t": 0.0, "cards": ()}
+_card_cache_locks = weakref.WeakKeyDictionary()  # 事件循环 -> asyncio.Lock
+
+
+def _card_info_from_row(card: dict) -> dict:
+    """数据库卡片记录 -> 绑卡流程使用的卡信息字典"""
+    mm, yy = _normalize_exp_parts(card.get('exp_month', ''), card.get('exp_year', ''))
+    zip_code = str(card.get('zip_code') or '').strip() or "10001"
+    return {
+        'id': card.get('id'),
+        'number': card.get('card_number', ''),
+        'exp_month': mm,
+        'exp_year': yy,
+        'cvv': card.get('cvv', ''),
+        'zip_code': zip_code,
+        'exp_combined': f"{mm}{yy}",
+    }
+
+
 def get_card_from_db() -> dict:
     """
     @brief 从数据库获取可用的卡片信息
     @return 卡信息字典，若无可用卡则返回None
     """
+    if DBManager is None:
+        return None
     try:
-        from core.database import DBManager
         cards = DBManager.get_available_cards()
         if cards:
-            card = cards[0]
-            mm, yy = _normalize_exp_parts(card.get('exp_month', ''), card.get('exp_year', ''))
-            zip_code = str(card.get('zip_code') or '').strip() or "10001"
-            return {
-                'id': card.get('id'),
-                'number': card.get('card_number', ''),
-                'exp_month': mm,
-                'exp_year': yy,
-                'cvv': card.get('cvv', ''),
-                'zip_code': zip_code,
-            }
+            return _card_info_from_row(cards[0])
+    except Exception as e:
+        print(f"[BindCard] 获取卡片失败: {e}")
+    return None
+
+
+async def get_card_from_db_async() -> dict:
+    """
+    @brief get_card_from_db 的异步版本，2 秒内的并发调用共用一次查询
+    @details 查询放到线程池执行，等锁期间不阻塞事件循环
+    @return 卡信息字典，若无可用卡则返回None
+    """
+    if DBManager is None:
+        return None
+    loop = asyncio.get_running_loop()
+    lock = _card_cache_locks.get(loop)
+    if lock is None:
+        lock = _card_cache_locks[loop] = asyncio.Lock()
+    try:
+        async with lock:
+            if not _card_cache["cards"] or time.time() - _card_cache["t"] >= _CARD_CACHE_TTL:
+                cards = await asyncio.to_thread(DBManager.get_available_cards)
+                _card_cache["cards"] = tuple(cards or ())
+                _card_cache["t"] = time.time()
+            cards = _card_cache["cards"]
+        if cards:
+            return _card_info_from_row(cards[0])
     except Exception as e:
         print(f"[BindCard] 获取卡片失败: {e}")
     return None
@@ -77,9 +422,12 @@ def update_card_usage(card_id: int):
     @brief 更新卡片使用次数
     @param card_id 卡片ID
     """
+    if DBManager is None:
+        return
     try:
-        from core.database import DBManager
         DBManager.increment_card_usage(card_id)
+        # 使用次数变化后缓存作废，下次重新查询（避免已达上限的卡继续被分配）
+        _card_cache["t"] = 0.0
     except Exception as e:
         print(f"[BindCard] 更新卡片使用次数失败: {e}")
 
@@ -94,42 +442,53 @@ async def auto_bind_card(page: Page, card_info: dict = None, account_info: dict
     """
     # 优先从数据库获取卡片
     if card_info is None:
-        card_info = get_card_from_db()
+        card_info = await get_card_from_db_async()
         if card_info is None:
             return False, "数据库中无可用卡片，请先在Web管理界面导入卡片"
-    
+
+    # 有效期与 zip 在进入流程前解析一次（数据库卡片已预计算，外部传入的卡在此归一化）
+    exp_combined = card_info.get('exp_combined') or "".join(
+        _normalize_exp_parts(card_info.get('exp_month', ''), card_info.get('exp_year', ''))
+    )
+    # Billing zip code（可能存在，也可能不需要；兜底 10001）
+    zip_code = str(card_info.get('zip_code') or card_info.get('zip') or card_info.get('postal') or '').strip() or "10001"
+
     try:
         print("[BindCard] 开始自动绑卡流程...")
         
         # 等待页面加载
-        await asyncio.sleep(3)
+        try:
+            await page.wait_for_load_state("domcontentloaded", timeout=10000)
+        except Exception:
+            pass
 
         # Step 0: 已订阅检测（参考 bit 项目：已订阅则直接返回成功）
         try:
+            from google.backend.google_auth import check_google_one_status
+
+            # 页面“已订阅”文案与资格检测并发进行，任一给出已订阅即返回
+            text_task = asyncio.ensure_future(
+                page.wait_for_selector(_ALREADY_SUBSCRIBED_SEL, state="attached", timeout=12000)
+            )
+            status_task = asyncio.ensure_future(check_google_one_status(page, timeout=12, only_check_subscribed=True))
             try:
-                if await page.locator('text=/already\\s+subscribed/i').count() > 0:
+                await asyncio.wait({text_task, status_task}, return_when=asyncio.FIRST_COMPLETED)
+                if text_task.done() and not text_task.cancelled() and text_task.exception() is None:
                     print("[BindCard] ✅ 检测到账号已订阅(You're already subscribed)，跳过绑卡流程")
-                    if account_info and account_info.get("email"):
-                        try:
-                            from core.database import DBManager
-                            DBManager.update_account_status(account_info["email"], "subscribed")
-                        except Exception:
-                            pass
+                    if account_info:
+                        await asyncio.to_thread(_mark_subscribed, account_info.get("email"))
                     return True, "已订阅 (Already Subscribed)"
-            except Exception:
-                pass
-
-            from google.backend.google_auth import check_google_one_status
+                status, _ = await status_task
+            finally:
+                for task in (text_task, status_task):
+                    if not task.done():
+                        task.cancel()
+                await asyncio.gather(text_task, status_task, return_exceptions=True)
 
-            status, _ = await check_google_one_status(page, timeout=12)
             if status in ("subscribed", "subscribed_antigravity"):
                 print("[BindCard] ✅ 检测到账号已订阅，跳过绑卡流程")
-                if account_info and account_info.get("email"):
-                    try:
-                        from core.database import DBManager
-                        DBManager.update_account_status(account_info["email"], status)
-                    except Exception:
-                        pass
+                if account_info:
+                    await asyncio.to_thread(_mark_subscribed, account_info.get("email"), status)
                 return True, f"已订阅 (Already Subscribed: {status})"
         except Exception:
             pass
@@ -153,108 +512,103 @@ async def auto_bind_card(page: Page, card_info: dict = None, account_info: dict
                 except:
                     continue
             
-            await asyncio.sleep(8)
+            try:
+                await page.wait_for_load_state("networkidle", timeout=15000)
+            except Exception:
+                pass
         except Exception as e:
             print(f"[BindCard] Get student offer 点击失败: {e}")
         
         # Step 2: 检查是否已绑卡(订阅按钮是否出现)
         print("[BindCard] 步骤2: 检查是否已绑卡...")
-        await asyncio.sleep(3)
+        try:
+            await page.wait_for_selector('iframe[src*="tokenized.play.google.com"]', state="attached", timeout=5000)
+        except Exception:
+            pass
         
         try:
             iframe_locator = page.frame_locator('iframe[src*="tokenized.play.google.com"]')
-            
-            subscribe_selectors = [
-                'button:has-text("Subscribe")',
-                'button:has-text("Subscribe now")',
-                '[role="button"]:has-text("Subscribe")',
-                'button:has-text("订阅")',
-                'button:has-text("立即订阅")',
-                '[role="button"]:has-text("订阅")',
-            ]
-            
-            for selector in subscribe_selectors:
-                try:
-                    element = iframe_locator.locator(selector).first
-                    if await element.count() > 0:
-                        print("[BindCard] ✅ 账号已绑卡，直接订阅...")
-                        await element.click()
-                        await asyncio.sleep(10)
-                        return await _check_subscription_status(page, account_info)
-                except:
-                    continue
+            element = iframe_locator.locator(_DIRECT_SUBSCRIBE_SEL).first
+            if await element.count() > 0:
+                print("[BindCard] ✅ 账号已绑卡，直接订阅...")
+                await element.click()
+                return await _wait_subscribed(page, account_info, 30)
         except:
             pass
         
         # Step 3: 切换到iframe并点击Add card
         print("[BindCard] 步骤3: 切换到iframe...")
-        await asyncio.sleep(10)
         
         try:
             iframe_selector = 'iframe[src*="tokenized.play.google.com"]'
-            deadline = time.time() + 40
-            while time.time() < deadline:
-                try:
-                    if await page.locator('text=/already\\s+subscribed/i').count() > 0:
-                        print("[BindCard] ✅ 未发现付款iframe，但页面显示已订阅，跳过绑卡流程")
-                        if account_info and account_info.get("email"):
-                            try:
-                                from core.database import DBManager
-                                DBManager.update_account_status(account_info["email"], "subscribed")
-                            except Exception:
-                                pass
-                        return True, "已订阅 (Already Subscribed)"
-                except Exception:
-                    pass
-                try:
-                    if await page.locator(iframe_selector).count() > 0:
-                        break
-                except Exception:
-                    pass
-                await asyncio.sleep(1)
-
-            iframe_count = 0
-            try:
-                iframe_count = await page.locator(iframe_selector).count()
-            except Exception:
-                iframe_count = 0
-            if iframe_count <= 0:
+            # 付款 iframe 与“已订阅”文案并发等待，谁先出现走谁的分支
+            hit = await _first_ready({
+                "subscribed": page.wait_for_selector(_ALREADY_SUBSCRIBED_SEL, state="attached", timeout=40000),
+                "iframe": page.wait_for_selector(iframe_selector, state="attached", timeout=40000),
+            })
+            if hit == "subscribed":
+                print("[BindCard] ✅ 未发现付款iframe，但页面显示已订阅，跳过绑卡流程")
+                if account_info:
+                    await asyncio.to_thread(_mark_subscribed, account_info.get("email"))
+                return True, "已订阅 (Already Subscribed)"
+            if hit is None:
                 return False, "未发现付款iframe（可能页面未加载完成/网络问题/账号已订阅）"
 
-            iframe_locator = page.frame_locator(iframe_selector)
+            # 付款 iframe 解析为 Frame 后在后续步骤复用；解析失败时退回 frame_locator
+            payment_frame = await _content_frame(page, iframe_selector) or page.frame_locator(iframe_selector)
+            card_frame = None
+            iframe_locator = payment_frame
             try:
-                await iframe_locator.locator("body").first.wait_for(state="attached", timeout=15000)
+                if isinstance(payment_frame, Frame):
+                    # 已拿到 Frame 时直接等它自身的文档就绪，不再轮询 body
+                    await payment_frame.wait_for_load_state("domcontentloaded", timeout=15000)
+                else:
+                    await iframe_locator.locator("body").first.wait_for(state="attached", timeout=15000)
             except Exception:
                 pass
             print("[BindCard] ✅ 找到付款iframe")
              
-            # 点击 Add card
-            await asyncio.sleep(10)
-            add_card_selectors = [
-                'span.PjwEQ:has-text("Add card")',
-                ':text("Add card")',
-            ]
-            
-            for selector in add_card_selectors:
+            # 点击 Add card（等按钮渲染出来，而不是固定等待）
+            try:
+                await iframe_locator.locator(':text("Add card")').first.wait_for(state="visible", timeout=15000)
+            except Exception:
+                pass
+            for selector in ADD_CARD_SELECTORS:
                 try:
                     element = iframe_locator.locator(selector).first
                     if await element.count() > 0:
                         await element.click()
                         print("[BindCard] ✅ 已点击 'Add card'")
                         break
-                except:
+                except Exception:
                     continue
             
-            await asyncio.sleep(10)
+            # 等待卡表单出现（第二层iframe或输入框）
+            try:
+                await iframe_locator.locator('iframe[name="hnyNZeIframe"], input').first.wait_for(
+                    state="attached", timeout=15000
+                )
+            except Exception:
+                pass
             
             # 检查是否有第二层iframe
             try:
-                inner_iframe = iframe_locator.frame_locator('iframe[name="hnyNZeIframe"]')
-                test = inner_iframe.locator('body')
-                if await test.count() > 0:
+                if isinstance(payment_frame, Frame):
+                    card_frame = await _content_frame(payment_frame, 'iframe[name="hnyNZeIframe"]')
+                else:
+                    inner_locator = payment_frame.frame_locator('iframe[name="hnyNZeIframe"]')
+                    if await inner_locator.locator('body').count() > 0:
+                        card_frame = inner_locator
+                if card_frame is not None:
+                    inner_iframe = card_frame
                     iframe_locator = inner_iframe
                     print("[BindCard] ✅ 找到第二层iframe")
-                    await asyncio.sleep(10)
+                    try:
+                        if isinstance(inner_iframe, Frame):
+                            await inner_iframe.wait_for_load_state("domcontentloaded", timeout=15000)
+                        await inner_iframe.locator('input').first.wait_for(state="visible", timeout=15000)
+                    except Exception:
+                        pass
             except:
                 pass
             
@@ -263,15 +617,16 @@ async def auto_bind_card(page: Page, card_info: dict = None, account_info: dict
         
         # Step 4: 填写卡号
         print(f"[BindCard] 步骤4: 填写卡号 {card_info['number'][:4]}****")
-        await asyncio.sleep(2)
         
         try:
             resolved = None
             candidates = []
-            try:
-                candidates.append(iframe_locator.frame_locator('iframe[name="hnyNZeIframe"]'))
-            except Exception:
-                pass
+            if card_frame is None:
+                # 第二层 iframe 还没解析到（可能 Add card 后才渲染），再试一次
+                try:
+                    candidates.append(payment_frame.frame_locator('iframe[name="hnyNZeIframe"]'))
+                except Exception:
+                    pass
             candidates.append(iframe_locator)
             for cand in candidates:
                 try:
@@ -292,72 +647,77 @@ async def auto_bind_card(page: Page, card_info: dict = None, account_info: dict
             if input_count < 3:
                 return False, f"输入框数量不足: {input_count}"
             
-            # 填写卡号、过期日期、CVV（先click再fill，确保输入不被清空）
-            card_number_input = all_inputs.nth(0)
-            await card_number_input.click()
-            await asyncio.sleep(0.2)
-            await card_number_input.fill(card_info['number'])
-            await asyncio.sleep(0.5)
-            # 验证卡号是否填写成功
-            filled_value = await card_number_input.input_value()
-            if not filled_value or len(filled_value.replace(' ', '').replace('-', '')) < 10:
-                print("[BindCard] ⚠️ 卡号可能未正确填写，使用type方式重试...")
+            # 快速路径：一次 evaluate 写入卡号、过期日期、CVV，等表单脚本处理完后用 input_value() 逐个回读，
+            # 回读的数字与期望不一致（被表单重置/未接受）的字段再走 click -> fill（卡号再不行用 type）
+            card_values = [card_info['number'], exp_combined, card_info['cvv']]
+            fast_ok = [False, False, False]
+            try:
+                await all_inputs.evaluate_all(_BATCH_FILL_JS, card_values)
+                await asyncio.sleep(0.3)
+                for idx, value in enumerate(card_values):
+                    filled = await all_inputs.nth(idx).input_value()
+                    fast_ok[idx] = bool(value) and _digits_only(filled) == _digits_only(value)
+            except Exception:
+                pass
+
+            if not fast_ok[0]:
+                card_number_input = all_inputs.nth(0)
                 await card_number_input.click()
-                await asyncio.sleep(0.1)
-                await card_number_input.press("Control+a")
-                await asyncio.sleep(0.05)
-                await card_number_input.press("Backspace")
-                await asyncio.sleep(0.1)
-                await card_number_input.type(card_info['number'], delay=50)
+                await asyncio.sleep(0.2)
+                await card_number_input.fill(card_info['number'])
                 await asyncio.sleep(0.5)
+                # 验证卡号是否填写成功
+                filled_value = await card_number_input.input_value()
+                if not filled_value or len(filled_value.replace(' ', '').replace('-', '')) < 10:
+                    print("[BindCard] ⚠️ 卡号可能未正确填写，使用type方式重试...")
+                    await card_number_input.click()
+                    await asyncio.sleep(0.1)
+                    await card_number_input.press("Control+a")
+                    await asyncio.sleep(0.05)
+                    await card_number_input.press("Backspace")
+                    await asyncio.sleep(0.1)
+                    await card_number_input.type(card_info['number'], delay=50)
+                    await asyncio.sleep(0.5)
             print("[BindCard] ✅ 卡号已填写")
-            
-            exp_month, exp_year = _normalize_exp_parts(card_info.get('exp_month', ''), card_info.get('exp_year', ''))
-            exp_input = all_inputs.nth(1)
-            await exp_input.click()
-            await asyncio.sleep(0.1)
-            await exp_input.fill(f"{exp_month}{exp_year}")
-            await asyncio.sleep(0.3)
+
+            if not fast_ok[1]:
+                exp_input = all_inputs.nth(1)
+                await exp_input.click()
+                await asyncio.sleep(0.1)
+                await exp_input.fill(exp_combined)
+                await asyncio.sleep(0.3)
             print("[BindCard] ✅ 过期日期已填写")
-            
-            cvv_input = all_inputs.nth(2)
-            await cvv_input.click()
-            await asyncio.sleep(0.1)
-            await cvv_input.fill(card_info['cvv'])
 
+            if not fast_ok[2]:
+                cvv_input = all_inputs.nth(2)
+                await cvv_input.click()
+                await asyncio.sleep(0.1)
+                await cvv_input.fill(card_info['cvv'])
+                await asyncio.sleep(0.3)
             print("[BindCard] ✅ CVV已填写")
-            await asyncio.sleep(0.3)
-
-            # Billing zip code（可能存在，也可能不需要；兜底 10001）
-            zip_code = str(card_info.get('zip_code') or card_info.get('zip') or card_info.get('postal') or '').strip() or "10001"
-            zip_filled = False
 
             async def safe_fill_input(loc, value: str) -> bool:
-                """安全填写输入框：click -> fill -> 验证 -> 必要时用type重试"""
+                """安全填写输入框：click -> fill（fill 自身会等待值写入，校验在全部填完后统一做一次）"""
                 try:
                     await loc.click()
                     await asyncio.sleep(0.2)
                     await loc.fill(value)
-                    await asyncio.sleep(0.5)
-                    # 验证是否填写成功
-                    filled = await loc.input_value()
-                    if filled and filled.replace(' ', '').replace('-', '') == value.replace(' ', '').replace('-', ''):
-                        return True
-                    # 重试用type方式
-                    print(f"[BindCard] ⚠️ 填写验证失败，使用type方式重试...")
-                    await loc.click()
-                    await asyncio.sleep(0.1)
-                    await loc.press("Control+a")
-                    await asyncio.sleep(0.05)
-                    await loc.press("Backspace")
-                    await asyncio.sleep(0.1)
-                    await loc.type(value, delay=50)
-                    await asyncio.sleep(0.5)
                     return True
                 except Exception as e:
                     print(f"[BindCard] 填写失败: {e}")
                     return False
 
+            async def retype_input(loc, value: str):
+                """type 方式重填：全选删除后逐字输入"""
+                await loc.click()
+                await asyncio.sleep(0.1)
+                await loc.press("Control+a")
+                await asyncio.sleep(0.05)
+                await loc.press("Backspace")
+                await asyncio.sleep(0.1)
+                await loc.type(value, delay=50)
+                await asyncio.sleep(0.5)
+
             def _zip_hint_ok(h: str) -> bool:
                 h = (h or "").lower()
                 return any(
@@ -392,99 +752,59 @@ async def auto_bind_card(page: Page, card_info: dict = None, account_info: dict
                     )
                 )
 
-            # 1) 优先在当前表单里按属性匹配（通常包含 placeholder/aria-label/autocomplete）
-            for idx in range(3, input_count):
-                try:
-                    loc = all_inputs.nth(idx)
-                    if not await loc.is_visible():
-                        continue
-                    label = (await loc.get_attribute('aria-label') or '')
-                    placeholder = (await loc.get_attribute('placeholder') or '')
-                    name = (await loc.get_attribute('name') or '')
-                    autocomplete = (await loc.get_attribute('autocomplete') or '')
-                    hint = f"{label} {placeholder} {name} {autocomplete}"
-                    if _zip_hint_ok(hint):
-                        zip_filled = await safe_fill_input(loc, zip_code)
-                        if zip_filled:
-                            break
-                except Exception:
-                    continue
+            # Zip 候选统一打分后按分数依次尝试：
+            #   3 = 表单内属性命中（placeholder/aria-label/autocomplete 等）
+            #   2 = 表单内可见且为空的非姓名框（越靠后越优先，避免把 zip 填进姓名框）
+            #   1 = 跨 iframe 属性命中（不同账号/地区表单结构可能不同）
+            # 表单内候选来自一次 evaluate_all；只有表单内候选全部失败才扫描其它 iframe
+            async def _fill_best_zip(cands):
+                for _, _, inputs, idx in sorted(cands, key=lambda c: (-c[0], c[1])):
+                    if await safe_fill_input(inputs.nth(idx), zip_code):
+                        return inputs, idx
+                return None
 
-            # 2) 兜底：表单里找“可见且为空”的最后一个输入框（避免把 zip 填进姓名框）
-            if not zip_filled:
-                for idx in range(input_count - 1, 2, -1):
-                    try:
-                        loc = all_inputs.nth(idx)
-                        if not await loc.is_visible():
-                            continue
-                        label = (await loc.get_attribute('aria-label') or '')
-                        placeholder = (await loc.get_attribute('placeholder') or '')
-                        name = (await loc.get_attribute('name') or '')
-                        autocomplete = (await loc.get_attribute('autocomplete') or '')
-                        hint = f"{label} {placeholder} {name} {autocomplete}".lower()
-                        if _name_hint_ok(hint):
-                            continue
-                        val = (await loc.input_value() or "").strip()
-                        if not val:
-                            zip_filled = await safe_fill_input(loc, zip_code)
-                            if zip_filled:
-                                break
-                    except Exception:
-                        continue
+            zip_candidates = []
+            for idx, meta in enumerate(await _input_metas(all_inputs)):
+                if idx < 3 or not meta["visible"]:
+                    continue
+                if _zip_hint_ok(meta["hint"]):
+                    zip_candidates.append((3, idx, all_inputs, idx))
+                elif not _name_hint_ok(meta["hint"]) and not meta["value"].strip():
+                    zip_candidates.append((2, -idx, all_inputs, idx))
+            zip_target = await _fill_best_zip(zip_candidates)
 
-            # 3) 仍未命中：跨 iframe 再扫一遍（不同账号/地区表单结构可能不同）
-            if not zip_filled:
-                payment_iframe = page.frame_locator('iframe[src*="tokenized.play.google.com"]')
+            if zip_target is None:
                 zip_scopes = []
-                try:
-                    zip_scopes.append(payment_iframe.frame_locator('iframe[name="hnyNZeIframe"]'))
-                except Exception:
-                    pass
-                zip_scopes.extend([iframe_locator, payment_iframe, page])
-                for scope in zip_scopes:
+                if card_frame is None:
                     try:
-                        inputs = scope.locator('input')
-                        count = await inputs.count()
-                        for idx in range(count):
-                            loc = inputs.nth(idx)
-                            try:
-                                if not await loc.is_visible():
-                                    continue
-                            except Exception:
-                                continue
-                            label = (await loc.get_attribute('aria-label') or '')
-                            placeholder = (await loc.get_attribute('placeholder') or '')
-                            name = (await loc.get_attribute('name') or '')
-                            autocomplete = (await loc.get_attribute('autocomplete') or '')
-                            hint = f"{label} {placeholder} {name} {autocomplete}"
-                            if _zip_hint_ok(hint):
-                                zip_filled = await safe_fill_input(loc, zip_code)
-                                if zip_filled:
-                                    break
+                        zip_scopes.append(payment_frame.frame_locator('iframe[name="hnyNZeIframe"]'))
                     except Exception:
-                        continue
-                    if zip_filled:
-                        break
+                        pass
+                for scope in (card_frame, payment_frame, page):
+                    if scope is not None and scope is not iframe_locator and scope not in zip_scopes:
+                        zip_scopes.append(scope)
+                zip_candidates = []
+                for scope in zip_scopes:
+                    inputs = scope.locator('input')
+                    for idx, meta in enumerate(await _input_metas(inputs)):
+                        if meta["visible"] and _zip_hint_ok(meta["hint"]):
+                            zip_candidates.append((1, len(zip_candidates), inputs, idx))
+                zip_target = await _fill_best_zip(zip_candidates)
 
-            if zip_filled:
+            if zip_target is not None:
+                # 填完后一次 evaluate_all 读回校验，仅在值不符时走 type 重填
+                zip_inputs, zip_idx = zip_target
+                metas = await _input_metas(zip_inputs)
+                filled = metas[zip_idx]["value"] if zip_idx < len(metas) else ""
+                if metas and filled.replace(' ', '').replace('-', '') != zip_code.replace(' ', '').replace('-', ''):
+                    print("[BindCard] ⚠️ 填写验证失败，使用type方式重试...")
+                    try:
+                        await retype_input(zip_inputs.nth(zip_idx), zip_code)
+                    except Exception as e:
+                        print(f"[BindCard] 填写失败: {e}")
                 print("[BindCard] ✅ Zip已填写")
             else:
                 print("[BindCard] ⚠️ 未找到Zip输入框")
-            if zip_filled and input_count > 3:
-                try:
-                    zip_verified = False
-                    for idx in range(3, input_count):
-                        loc = all_inputs.nth(idx)
-                        if not await loc.is_visible():
-                            continue
-                        val = (await loc.input_value() or "").strip()
-                        if val == zip_code:
-                            zip_verified = True
-                            break
-                    if not zip_verified:
-                        print("[BindCard] ⚠️ Zip可能未写入到当前可见输入框")
-                except Exception:
-                    pass
             print("[BindCard] ✅ CVV已填写")
             
         except Exception as e:
@@ -493,244 +813,153 @@ async def auto_bind_card(page: Page, card_info: dict = None, account_info: dict
         # Step 5: 点击 Save card
         print("[BindCard] 步骤5: 保存卡信息...")
         try:
-            save_selectors = [
-                'button:has-text("Save card")',
-                'button:has-text("Save")',
-            ]
-            
             saved_clicked = False
-            for selector in save_selectors:
+            for selector in SAVE_CARD_SELECTORS:
                 try:
-                    element = iframe_locator.locator(selector).first
-                    if await element.count() > 0 and await element.is_visible():
-                        clicked = False
+                    # 只取可见的第一个，避免隐藏的同名按钮排在前面
+                    element = iframe_locator.locator(selector).locator("visible=true").first
+                    if await element.count() == 0:
+                        continue
+                    try:
+                        await element.click(force=True, timeout=3000)
+                        saved_clicked = True
+                    except Exception:
                         try:
-                            await element.click(force=True, timeout=3000)
-                            clicked = True
+                            await element.evaluate("el => el.click()")
+                            saved_clicked = True
                         except Exception:
-                            try:
-                                await element.evaluate("el => el.click()")
-                                clicked = True
-                            except Exception:
-                                clicked = False
-                        if not clicked:
                             continue
-                        print("[BindCard] ✅ 已点击 'Save card'")
-                        saved_clicked = True
-                        break
-                except:
+                    print("[BindCard] ✅ 已点击 'Save card'")
+                    break
+                except Exception:
                     continue
 
             if not saved_clicked:
                 return False, "未找到 Save card 按钮"
 
             # 等待表单处理完成（避免仍停留在绑卡表单导致后续订阅按钮不可用）
-            deadline = time.time() + 20
-            while time.time() < deadline:
-                try:
-                    still_form = await iframe_locator.locator('button:has-text("Save card")').count() > 0
-                    if not still_form:
-                        break
-                except Exception:
-                    break
-                await asyncio.sleep(1)
+            try:
+                await iframe_locator.locator('button:has-text("Save card")').first.wait_for(
+                    state="detached", timeout=20000
+                )
+            except Exception:
+                pass
             
         except Exception as e:
             return False, f"保存卡失败: {e}"
         
         # Step 6: 点击订阅按钮
         print("[BindCard] 步骤6: 等待订阅页面...")
-        await asyncio.sleep(5)
-        
-        try:
-            subscribe_selectors = [
-                'button:has-text("Subscribe")',
-                'button:has-text("Subscribe now")',
-                'button:has-text("Start subscription")',
-                'button:has-text("Start plan")',
-                'button:has-text("Continue")',
-                'button:has-text("订阅")',
-                'button:has-text("立即订阅")',
-                'button:has-text("开始订阅")',
-                'button:has-text("继续")',
-            ]
 
-            async def _click_best(locator) -> bool:
-                try:
-                    count = await locator.count()
-                except Exception:
-                    return False
-                best = None
-                best_score = None
-                for idx in range(count):
-                    el = locator.nth(idx)
-                    try:
-                        if not await el.is_visible():
-                            continue
-                    except Exception:
-                        continue
-                    try:
-                        if not await el.is_enabled():
-                            continue
-                    except Exception:
-                        pass
-                    try:
-                        box = await el.bounding_box()
-                    except Exception:
-                        box = None
-                    score = None
-                    if box:
-                        bottom = (box.get("y", 0) or 0) + (box.get("height", 0) or 0)
-                        right = (box.get("x", 0) or 0) + (box.get("width", 0) or 0)
-                        area = (box.get("width", 0) or 0) * (box.get("height", 0) or 0)
-                        score = bottom * 1_000_000_000 + right * 1_000_000 + area
-                    else:
-                        score = idx
-                    try:
-                        tag = await el.evaluate("el => el.tagName")
-                        if (tag or "").upper() == "BUTTON":
-                            score += 50_000
-                    except Exception:
-                        pass
-                    try:
-                        cls = await el.get_attribute("class") or ""
-                        if "VfPpkd-LgbsSe" in cls:
-                            score += 100_000
-                    except Exception:
-                        pass
-                    if best is None or (best_score is None) or (score > best_score):
-                        best = el
-                        best_score = score
-                if best is None:
-                    return False
-                try:
-                    await best.scroll_into_view_if_needed()
-                except Exception:
-                    pass
-                try:
-                    await best.click(timeout=5000)
-                    return True
-                except Exception:
-                    try:
-                        await best.click(force=True, timeout=3000)
-                        return True
-                    except Exception:
-                        try:
-                            await best.evaluate("el => el.click()")
-                            return True
-                        except Exception:
-                            return False
+        # 监听下单接口响应，作为复查订阅状态的信号（先于点击注册，避免漏掉响应）
+        sub_done = asyncio.Event()
 
+        def _on_subscribe_response(response):
+            try:
+                if response.status == 200 and any(k in response.url for k in _SUBSCRIBE_DONE_MARKERS):
+                    sub_done.set()
+            except Exception:
+                pass
+
+        page.on("response", _on_subscribe_response)
+        try:
             clicked = False
-            deadline = time.time() + 60
-            while time.time() < deadline and not clicked:
-                scopes = [page]
-                for frame in page.frames:
-                    url = (frame.url or "").lower()
-                    name = (frame.name or "").lower()
-                    if any(k in url for k in ["tokenized.play.google.com", "payments.google.com", "pay.google.com", "instrumentmanager", "payment"]):
-                        if frame not in scopes:
-                            scopes.append(frame)
-                    elif any(k in name for k in ["paymentsmodaliframe", "ucc-", "hnynzeiframe"]):
-                        if frame not in scopes:
-                            scopes.append(frame)
-
-                for frame in page.frames:
-                    if frame not in scopes:
-                        scopes.append(frame)
-
-                role_name_patterns = [
-                    re.compile(r"^\s*Subscribe\s*$", re.I),
-                    re.compile(r"^\s*Subscribe now\s*$", re.I),
-                    re.compile(r"^\s*Start subscription\s*$", re.I),
-                    re.compile(r"^\s*Start plan\s*$", re.I),
-                    re.compile(r"^\s*Continue\s*$", re.I),
-                    re.compile(r"^\s*订阅\s*$", re.I),
-                    re.compile(r"^\s*立即订阅\s*$", re.I),
-                    re.compile(r"^\s*开始订阅\s*$", re.I),
-                    re.compile(r"^\s*继续\s*$", re.I),
-                ]
+            # frame 列表只在 frame 增减/导航后重建，轮询中复用
+            frames_state = {"dirty": True}
+
+            def _mark_frames_dirty(_frame=None):
+                frames_state["dirty"] = True
+
+            frame_events = ("frameattached", "framedetached", "framenavigated")
+            for evt in frame_events:
+                page.on(evt, _mark_frames_dirty)
+
+            # frame_scopes：逐 frame 的页面内扫描（含主 frame）；scopes：弹窗/按钮兜底查找，page 在前
+            frame_scopes = []
+            scopes = [page]
+            try:
+                deadline = time.time() + 60
+                while time.time() < deadline and not clicked:
+                    if frames_state["dirty"]:
+                        frames_state["dirty"] = False
+                        frame_scopes = _subscribe_scopes(page)
+                        scopes = [page] + frame_scopes
+
+                    for scope in frame_scopes:
+                        if await _click_subscribe_in(scope):
+                            print("[BindCard] ✅ 已点击订阅按钮")
+                            clicked = True
+                            break
 
-                for scope in scopes:
-                    for pat in role_name_patterns:
-                        try:
-                            dialogs = scope.locator('[role="dialog"], dialog')
-                            if await dialogs.count() > 0:
-                                btns = dialogs.get_by_role("button", name=pat)
-                                if await btns.count() > 0 and await _click_best(btns):
-                                    print("[BindCard] ✅ 已点击订阅按钮")
-                                    clicked = True
-                                    break
-                            else:
-                                btns = scope.get_by_role("button", name=pat)
-                                if await btns.count() > 0 and await _click_best(btns):
-                                    print("[BindCard] ✅ 已点击订阅按钮")
-                                    clicked = True
-                                    break
-                        except Exception:
-                            continue
                     if clicked:
                         break
 
-                if clicked:
-                    break
-
-                for scope in scopes:
-                    for selector in subscribe_selectors:
+                    for scope in scopes:
                         try:
                             dialogs = scope.locator('[role="dialog"], dialog')
                             search_scope = dialogs if await dialogs.count() > 0 else scope
-                            btns = search_scope.locator(selector)
-                            if await btns.count() > 0 and await _click_best(btns):
+                            btns = search_scope.locator(_SUBSCRIBE_SEL)
+                            if await _click_best(btns):
                                 print("[BindCard] ✅ 已点击订阅按钮")
                                 clicked = True
                                 break
                         except Exception:
                             continue
-                    if clicked:
-                        break
 
-                if not clicked:
-                    await asyncio.sleep(2)
+                    if not clicked:
+                        await asyncio.sleep(2)
+            finally:
+                for evt in frame_events:
+                    try:
+                        page.remove_listener(evt, _mark_frames_dirty)
+                    except Exception:
+                        pass
 
             if not clicked:
-                fallback_selectors = [
-                    'button[type="submit"]',
-                    'button.VfPpkd-LgbsSe-OWXEXe-k8QpJ',
-                    'button.VfPpkd-LgbsSe',
-                    '[role="button"][type="submit"]',
-                ]
                 for scope in scopes:
-                    for selector in fallback_selectors:
-                        try:
-                            dialogs = scope.locator('[role="dialog"], dialog')
-                            search_scope = dialogs if await dialogs.count() > 0 else scope
-                            btns = search_scope.locator(selector)
-                            if await btns.count() > 0 and await _click_best(btns):
-                                print(f"[BindCard] ✅ 已点击提交按钮({selector})")
-                                clicked = True
-                                break
-                        except Exception:
-                            continue
-                    if clicked:
-                        break
+                    try:
+                        dialogs = scope.locator('[role="dialog"], dialog')
+                        search_scope = dialogs if await dialogs.count() > 0 else scope
+                        btns = search_scope.locator(_SUBMIT_FALLBACK_SEL)
+                        if await _click_best(btns):
+                            print("[BindCard] ✅ 已点击提交按钮")
+                            clicked = True
+                            break
+                    except Exception:
+                        continue
 
             if not clicked:
                 print("[BindCard] ⚠️ 未找到订阅按钮")
 
             if clicked:
                 print("[BindCard] 等待订阅确认(Subscribed)...")
-                deadline = time.time() + 90
-                while time.time() < deadline:
-                    ok, msg = await _check_subscription_status(page, account_info)
+                # 页面 Subscribed 标志轮询与下单接口响应并发等待；接口先返回时立即复查一次页面，
+                # 未确认则继续等轮询（以页面状态为准，由 _check_subscription_status 落库）
+                poll_task = asyncio.ensure_future(_wait_subscribed(page, account_info, 90))
+                event_task = asyncio.ensure_future(sub_done.wait())
+                try:
+                    await asyncio.wait({poll_task, event_task}, return_when=asyncio.FIRST_COMPLETED)
+                    if not poll_task.done():
+                        print("[BindCard] 订阅接口已返回，复查订阅状态...")
+                        ok, msg = await _check_subscription_status(page, account_info)
+                        if ok:
+                            return True, msg
+                    ok, msg = await poll_task
                     if ok:
                         return True, msg
-                    await asyncio.sleep(2)
-            else:
-                await asyncio.sleep(10)
+                finally:
+                    for task in (poll_task, event_task):
+                        if not task.done():
+                            task.cancel()
+                    await asyncio.gather(poll_task, event_task, return_exceptions=True)
             
         except Exception as e:
             print(f"[BindCard] 订阅按钮点击失败: {e}")
+        finally:
+            try:
+                page.remove_listener("response", _on_subscribe_response)
+            except Exception:
+                pass
         
         return await _check_subscription_status(page, account_info)
         
@@ -746,46 +975,25 @@ async def _check_subscription_status(page: Page, account_info: dict = None) -> T
     try:
         iframe_locator = page.frame_locator('iframe[src*="tokenized.play.google.com"]')
         
-        subscribed_selectors = [
-            'text=/already\\s+subscribed/i',
-            'text=/manage\\s+plan/i',
-            ':text("Subscribed")',
-            'text=Subscribed',
-            ':text("已订阅")',
-            'text=已订阅',
-        ]
-        
-        for selector in subscribed_selectors:
+        # 主 frame 与 page 等价，跳过以免重复检查
+        scopes = [iframe_locator, page]
+        try:
+            main_frame = page.main_frame
+            scopes.extend(f for f in page.frames if f is not main_frame)
+        except Exception:
+            pass
+
+        for scope in scopes:
             try:
-                scopes = []
-                try:
-                    scopes.append(iframe_locator)
-                except Exception:
-                    pass
-                scopes.append(page)
-                try:
-                    scopes.extend([f for f in page.frames if f not in scopes])
-                except Exception:
-                    pass
+                if await scope.locator(_SUBSCRIBED_SEL).first.count() > 0:
+                    print("[BindCard] ✅ 检测到 'Subscribed'，订阅成功！")
 
-                for scope in scopes:
-                    try:
-                        element = scope.locator(selector).first
-                        if await element.count() > 0:
-                            print("[BindCard] ✅ 检测到 'Subscribed'，订阅成功！")
-
-                            # 更新数据库状态
-                            if account_info and account_info.get('email'):
-                                try:
-                                    from core.database import DBManager
-                                    DBManager.update_account_status(account_info['email'], 'subscribed')
-                                except Exception:
-                                    pass
-
-                            return True, "绑卡订阅成功 (Subscribed)"
-                    except Exception:
-                        continue
-            except:
+                    # 更新数据库状态
+                    if account_info:
+                        await asyncio.to_thread(_mark_subscribed, account_info.get("email"))
+
+                    return True, "绑卡订阅成功 (Subscribed)"
+            except Exception:
                 continue
         try:
             still_form = await iframe_locator.locator('button:has-text("Save card")').count() > 0
@@ -800,96 +1008,234 @@ async def _check_subscription_status(page: Page, account_info: dict = None) -> T
         return False, f"订阅状态检查异常: {e}"
 
 
-def process_bind_card(browser_id: str, card_info: dict = None, log_callback: Callable = None) -> Tuple[bool, str]:
+class PlaywrightRuntime:
     """
-    @brief 处理单个浏览器的绑卡订阅
-    @param browser_id 浏览器ID
-    @param card_info 卡信息
-    @param log_callback 日志回调
-    @return (success, message)
+    @brief 共享的 Playwright 运行时
+    @details 后台线程常驻一个事件循环和一个 Playwright 实例（Node 驱动进程只启动一次），
+             各次绑卡通过 submit 提交协程，省去每次 asyncio.run + async_playwright() 的启动开销
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._start_lock = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="PlaywrightRuntime", daemon=True
+                )
+                self._thread.start()
+                self._playwright = None
+                self._start_lock = None
+            return self._loop
+
+    async def get_playwright(self):
+        """在运行时事件循环内调用，首次使用时启动 Playwright"""
+        if self._playwright is None:
+            if self._start_lock is None:
+                self._start_lock = asyncio.Lock()
+            async with self._start_lock:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+        return self._playwright
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """
+        @brief 提交协程到运行时事件循环
+        @return concurrent.futures.Future，调用方可 .result() 阻塞等待
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def shutdown(self, timeout: float = 10):
+        """停止 Playwright 并关闭后台事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def _stop():
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(_stop(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+_runtime = PlaywrightRuntime()
+atexit.register(_runtime.shutdown)
+
+# 数据库账号行 -> ensure_google_login 所需 account_info 字段（源列, 目标键）
+_ROW_TO_ACCOUNT = (
+    ('email', 'email'),
+    ('password', 'password'),
+    ('recovery_email', 'backup'),
+    ('recovery_email', 'backup_email'),
+    ('secret_key', 'secret'),
+    ('secret_key', '2fa_secret'),
+)
+
+
+async def _bind_card_for_browser(browser_id: str, card_info: dict, log: Callable) -> Tuple[bool, str]:
+    """
+    @brief 单个浏览器的完整绑卡流程（在共享运行时事件循环内执行）
+    @details 同步的数据库/比特浏览器接口调用放到线程池，避免阻塞同一循环上的其他任务
     """
-    def log(msg):
-        print(msg)
-        if log_callback:
-            log_callback(msg)
-    
     log("打开浏览器...")
-    
+
     try:
         from core.bit_api import open_browser, close_browser, get_browser_info
-        from core.database import DBManager
         from google.backend.google_auth import ensure_google_login
     except ImportError as e:
         return False, f"导入失败: {e}"
-    
+    if DBManager is None:
+        return False, "导入失败: core.database"
+
     # 获取账号信息
-    account_info = None
-    try:
+    def _load_account_info():
         row = DBManager.get_account_by_browser_id(browser_id)
         if row:
-            recovery = row.get('recovery_email') or ''
-            secret = row.get('secret_key') or ''
-            account_info = {
-                'email': row.get('email') or '',
-                'password': row.get('password') or '',
-                'backup': recovery,
-                'backup_email': recovery,
-                'secret': secret,
-                '2fa_secret': secret
-            }
-        else:
-            browser_info = get_browser_info(browser_id)
-            if browser_info:
-                from core.database import build_account_info_from_remark
-                account_info = build_account_info_from_remark(browser_info.get('remark', ''))
+            return {dst: (row.get(src) or '') for src, dst in _ROW_TO_ACCOUNT}
+        browser_info = get_browser_info(browser_id)
+        if browser_info:
+            from core.database import build_account_info_from_remark
+            return build_account_info_from_remark(browser_info.get('remark', ''))
+        return None
+
+    account_info = None
+    try:
+        account_info = await asyncio.to_thread(_load_account_info)
     except Exception:
         pass
-    
+
     # 打开浏览器
-    result = open_browser(browser_id)
+    result = await asyncio.to_thread(open_browser, browser_id)
     if not result.get('success'):
         return False, f"打开浏览器失败: {result.get('msg', '未知错误')}"
-    
+
     ws_endpoint = result['data']['ws']
-    
-    async def _run():
-        async with async_playwright() as playwright:
-            try:
-                browser = await playwright.chromium.connect_over_cdp(ws_endpoint)
-                context = browser.contexts[0]
-                page = context.pages[0] if context.pages else await context.new_page()
-                
-                # 导航到目标页面
-                target_url = "https://one.google.com/ai-student?g1_landing_page=75"
-                log("导航到Google One学生页面...")
+
+    browser = None
+    try:
+        playwright = await _runtime.get_playwright()
+        browser = await playwright.chromium.connect_over_cdp(ws_endpoint)
+        context = browser.contexts[0]
+        # 优先复用已停在学生页的标签页，省掉一次整页导航
+        page = next((p for p in context.pages if (p.url or "").startswith(_TARGET_URL_PREFIX)), None)
+        if page is None:
+            page = context.pages[0] if context.pages else await context.new_page()
+
+        # 导航到目标页面
+        target_url = "https://one.google.com/ai-student?g1_landing_page=75"
+        if (page.url or "").startswith(_TARGET_URL_PREFIX):
+            log("复用已打开的Google One学生页面...")
+        else:
+            log("导航到Google One学生页面...")
+            await page.goto(target_url, wait_until='domcontentloaded', timeout=30000)
+        await _wait_landing_ready(page)
+
+        # 确保已登录
+        if account_info:
+            log("检查登录状态...")
+            success, msg = await ensure_google_login(page, account_info)
+            if not success:
+                return False, f"登录失败: {msg}"
+
+            # 登录流程跳转离开了学生页才重新导航
+            if not (page.url or "").startswith(_TARGET_URL_PREFIX):
                 await page.goto(target_url, wait_until='domcontentloaded', timeout=30000)
-                await asyncio.sleep(5)
-                
-                # 确保已登录
-                if account_info:
-                    log("检查登录状态...")
-                    success, msg = await ensure_google_login(page, account_info)
-                    if not success:
-                        return False, f"登录失败: {msg}"
-                    
-                    # 重新导航
-                    await page.goto(target_url, wait_until='domcontentloaded', timeout=30000)
-                    await asyncio.sleep(5)
-                
-                # 执行绑卡
-                return await auto_bind_card(page, card_info, account_info)
-                
-            except Exception as e:
-                return False, str(e)
-    
-    success, msg = asyncio.run(_run())
-    
+                await _wait_landing_ready(page)
+
+        # 执行绑卡
+        success, msg = await auto_bind_card(page, card_info, account_info)
+
+    except Exception as e:
+        return False, str(e)
+    finally:
+        # 只断开本次 CDP 连接，Playwright 实例留给后续任务复用
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
     # 订阅成功后自动关闭浏览器
     if success:
         try:
             log("订阅成功，关闭浏览器...")
-            close_browser(browser_id)
+            await asyncio.to_thread(close_browser, browser_id)
         except Exception as e:
             log(f"关闭浏览器失败: {e}")
-    
+
     return success, msg
+
+
+def process_bind_card(browser_id: str, card_info: dict = None, log_callback: Callable = None) -> Tuple[bool, str]:
+    """
+    @brief 处理单个浏览器的绑卡订阅
+    @param browser_id 浏览器ID
+    @param card_info 卡信息
+    @param log_callback 日志回调
+    @return (success, message)
+    """
+    def log(msg):
+        print(msg)
+        if log_callback:
+            log_callback(msg)
+
+    return _runtime.submit(_bind_card_for_browser(browser_id, card_info, log)).result()
+
+
+def process_bind_cards(
+    browser_ids: list,
+    card_info: dict = None,
+    log_callback: Callable = None,
+    concurrency: int = None,
+) -> dict:
+    """
+    @brief 批量绑卡订阅：在共享运行时上并发处理多个浏览器
+    @param browser_ids 浏览器ID列表
+    @param card_info 卡信息（None 则每个窗口各自从数据库取卡）
+    @param log_callback 日志回调，消息带浏览器ID前缀
+    @param concurrency 最大并发数，默认 min(8, 窗口数)
+    @return {browser_id: (success, message)}
+    """
+    browser_ids = list(browser_ids or [])
+    if not browser_ids:
+        return {}
+    limit = max(1, concurrency or min(8, len(browser_ids)))
+
+    async def _batch():
+        sem = asyncio.Semaphore(limit)
+
+        async def one(bid):
+            def log(msg):
+                print(msg)
+                if log_callback:
+                    log_callback(f"[{bid[:8]}...] {msg}")
+
+            async with sem:
+                return await _bind_card_for_browser(bid, card_info, log)
+
+        results = await asyncio.gather(*[one(bid) for bid in browser_ids], return_exceptions=True)
+        return {
+            bid: (res if not isinstance(res, BaseException) else (False, str(res)))
+            for bid, res in zip(browser_ids, results)
+        }
+
+    return _runtime.submit(_batch()).result()
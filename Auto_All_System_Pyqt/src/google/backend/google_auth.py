@@ -10,8 +10,9 @@ import asyncio
 import time
 import re
 import pyotp
+from functools import lru_cache
 from typing import Tuple, Optional, Dict, Any
-from playwright.async_api import Page, expect
+from playwright.async_api import Page, expect, TimeoutError as PlaywrightTimeoutError
 from .google_recovery import handle_recovery_email_challenge, detect_manual_verification
 
 # ==================== 登录状态枚举 ====================
@@ -28,6 +29,115 @@ class GoogleLoginStatus:
     UNKNOWN = "unknown"               
 
 
+# ==================== 选择器常量 ====================
+
+# 登录页输入框（可见即视为未登录）
+LOGIN_INPUT_SELECTORS = ('input[type="email"]', 'input[type="password"]')
+
+# 头像按钮选择器 (多个备选)，合并为一个 CSS 并集一次匹配
+AVATAR_SELECTORS = (
+    'a[aria-label*="Google Account"] img.gbii',
+    'a.gb_B[role="button"] img',
+    'a[href*="SignOutOptions"] img',
+    'img.gb_Q.gbii',
+    'a[aria-label*="Google 帐号"] img',
+    'a[aria-label*="Google 账号"] img',
+)
+AVATAR_CSS = ", ".join(AVATAR_SELECTORS)
+# 等待兜底时额外包含通用头像选择器（页面加载延迟/其他语言）
+_AVATAR_WAIT_CSS = AVATAR_CSS + ', a[aria-label*="Google"] img'
+
+# 等待任一头像可见（visible=true 在所有匹配中找可见的，而不是只看第一个匹配）
+_AVATAR_VISIBLE_SEL = _AVATAR_WAIT_CSS + " >> visible=true"
+
+# 登录状态快速检测：先登录输入框、再头像并集，按顺序取第一个可见命中
+_LOGIN_STATE_SELECTORS = LOGIN_INPUT_SELECTORS + (AVATAR_CSS,)
+
+# "Get student offer" 相关按钮
+OFFER_SELECTORS = (
+    'button:has-text("Get student offer")',
+    'button:has-text("Get offer")',
+    '[data-action="offerDetails"]',
+)
+_OFFER_CSS = ", ".join(OFFER_SELECTORS)
+
+# 登录后安全/Passkeys 提示的关闭按钮（多语言 Not now/Skip/Cancel 等）
+_DISMISS_LABELS = (
+    "Not now", "No thanks", "Cancel", "Later", "Skip", "Omitir", "Overslaan",
+    "暂不", "取消", "稍后", "跳过",
+)
+# 命中按钮的临时标记属性（页面内找到后打标，再用 locator 可信点击）
+_DISMISS_MARK_ATTR = "data-auto-dismiss-hit"
+# 一次页面内遍历：找第一个文字或 aria-label 命中上述文案的可见按钮并打标，返回是否找到
+_DISMISS_JS = """([labels, mark]) => {
+    const want = labels.map(l => l.toLowerCase());
+    const visible = e => {
+        const r = e.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(e).visibility !== 'hidden';
+    };
+    document.querySelectorAll('[' + mark + ']').forEach(e => e.removeAttribute(mark));
+    for (const e of document.querySelectorAll('button, [role="button"]')) {
+        // 嵌套按钮只看最外层
+        if (e.parentElement && e.parentElement.closest('button, [role="button"]')) continue;
+        const text = ((e.innerText || '') + ' ' + (e.getAttribute('aria-label') || '')).toLowerCase();
+        if (!want.some(l => text.includes(l)) || !visible(e)) continue;
+        e.setAttribute(mark, '1');
+        return true;
+    }
+    return false;
+}"""
+
+# 已订阅文案（精确 Subscribed/已订阅 或 already subscribed），合并为一次匹配
+_SUBSCRIBED_TEXT_CSS = ':text-is("Subscribed"), :text-is("已订阅"), :text-matches("already\\s+subscribed", "i")'
+
+# 资格页终态元素：待验证(hSRGPd) / 已验证(V67aGc) / 已订阅文案，任一出现即可开始检测
+_ELIGIBILITY_READY_SEL = (
+    '[jsname="hSRGPd"], [jsname="V67aGc"], '
+    ':text-matches("Subscribed|已订阅|already subscribed", "i")'
+)
+
+# 头像 aria-label 中的邮箱（"Google Account: Name  (email@gmail.com)"）
+_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+')
+
+# GI6Jdd 响应中的订阅特征（2 TB 套餐 / Antigravity），一次扫描完成
+_API_PAT = re.compile(r'2 ?TB|Antigravity')
+
+# SheerID 链接：先找 sheerid.com 链接，找不到再在页面 HTML 中正则匹配（都在页面内完成，不回传整页 HTML）
+_SHEERID_LINK_JS = r"""() => {
+    const a = document.querySelector('a[href*="sheerid.com"]');
+    const href = a && a.getAttribute('href');
+    if (href) return href;
+    const m = document.documentElement.outerHTML.match(/https:\/\/[^"']*sheerid\.com[^"']*/);
+    return m ? m[0] : null;
+}"""
+
+
+# 按顺序检查一组纯 CSS 选择器，返回第一个存在可见元素的下标（-1 表示都没有），一次往返完成
+_FIRST_VISIBLE_JS = """sels => {
+    const visible = e => {
+        const r = e.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(e).visibility !== 'hidden';
+    };
+    for (let i = 0; i < sels.length; i++) {
+        let els = [];
+        try { els = document.querySelectorAll(sels[i]); } catch (e) { continue; }
+        for (const e of els) { if (visible(e)) return i; }
+    }
+    return -1;
+}"""
+
+
+async def _first_visible(page: Page, selectors) -> int:
+    """
+    @brief 返回第一个有可见匹配元素的选择器下标（仅支持标准 CSS，不支持 :has-text 等 Playwright 扩展）
+    @return 下标；都不可见或检测失败返回 -1
+    """
+    try:
+        return await page.evaluate(_FIRST_VISIBLE_JS, list(selectors))
+    except Exception:
+        return -1
+
+
 # ==================== V2 检测逻辑 (核心) ====================
 
 async def check_google_login_by_avatar(page: Page, timeout: float = 10.0) -> bool:
@@ -43,47 +153,17 @@ async def check_google_login_by_avatar(page: Page, timeout: float = 10.0) -> boo
         if 'about:blank' in page.url:
             await page.goto("https://accounts.google.com/", wait_until="domcontentloaded")
 
-        # 登录页有输入框 => 未登录（对齐 bitbrowser-automation 判定逻辑）
-        try:
-            email_box = page.locator('input[type="email"]').first
-            if await email_box.count() > 0 and await email_box.is_visible():
-                return False
-        except Exception:
-            pass
-        try:
-            pwd_box = page.locator('input[type="password"]').first
-            if await pwd_box.count() > 0 and await pwd_box.is_visible():
-                return False
-        except Exception:
-            pass
+        # 一次往返同时检查登录输入框与头像：
+        # 登录页有输入框 => 未登录（对齐 bitbrowser-automation 判定逻辑），优先于头像判断
+        hit = await _first_visible(page, _LOGIN_STATE_SELECTORS)
+        if 0 <= hit < len(LOGIN_INPUT_SELECTORS):
+            return False
+        if hit == len(LOGIN_INPUT_SELECTORS):
+            return True
 
-        # 头像按钮选择器 (多个备选)
-        avatar_selectors = [
-            'a[aria-label*="Google Account"] img.gbii',
-            'a.gb_B[role="button"] img',
-            'a[href*="SignOutOptions"] img',
-            'img.gb_Q.gbii',
-            'a[aria-label*="Google 帐号"] img',
-            'a[aria-label*="Google 账号"] img'
-        ]
-        
-        # 尝试检测头像元素
-        # 使用first匹配，any即可
-        for selector in avatar_selectors:
-            try:
-                # 使用 expect 自动等待，设置较短超时避免所有都check一遍花太久，
-                # 但首个check需要足够时间等待页面加载
-                # 这里逻辑优化：并行的逻辑比较难写，顺序检查
-                locator = page.locator(selector).first
-                if await locator.count() > 0 and await locator.is_visible():
-                     return True
-            except:
-                continue
-                
-        # 如果上面快速检查没过，使用 expect 等待其中一个通用选择器（等待页面加载延迟）
+        # 如果上面快速检查没过，使用 expect 等待任一头像选择器可见（等待页面加载延迟）
         try:
-            primary_selector = 'a[aria-label*="Google"] img'
-            await expect(page.locator(primary_selector).first).to_be_visible(timeout=timeout * 1000)
+            await expect(page.locator(_AVATAR_WAIT_CSS).locator("visible=true").first).to_be_visible(timeout=timeout * 1000)
             return True
         except:
             pass
@@ -111,85 +191,99 @@ async def check_google_login_status(page: Page, timeout: float = 5.0) -> Tuple[s
 
 async def check_google_one_status(
     page: Page, 
-    timeout: float = 20.0
+    timeout: float = 20.0,
+    only_check_subscribed: bool = False
 ) -> Tuple[str, Optional[str]]:
     """
     @brief V2资格检测：通过 API 拦截 + jsname 属性检测资格状态
     @param page Playwright 页面对象
     @param timeout 超时时间(秒)
+    @param only_check_subscribed 只关心是否已订阅；API 明确未订阅时返回 'ineligible_fast'，跳过页面元素检测
     @return (status, sheerid_link)
-            status: 'subscribed_antigravity' | 'subscribed' | 'verified' | 'link_ready' | 'ineligible' | 'error'
+            status: 'subscribed_antigravity' | 'subscribed' | 'verified' | 'link_ready' | 'ineligible' | 'ineligible_fast' | 'error'
     """
     api_response_data = None
-    response_received = asyncio.Event()
-    
-    async def handle_response(response):
-        """响应拦截处理"""
-        nonlocal api_response_data
-        try:
-            # 关键特征 rpcids=GI6Jdd
-            if 'rpcids=GI6Jdd' in response.url:
-                text = await response.text()
-                api_response_data = text
-                response_received.set()
-                # print(f"[GoogleAuth] 🔍 拦截到 GI6Jdd API 响应")
-        except Exception:
-            pass
-    
-    # 注册响应监听器
-    page.on("response", handle_response)
     
     try:
-        # 导航到目标页面（如果不在的话）
+        # 导航到目标页面（如果不在的话），同时一次性等待 GI6Jdd API 响应 (最多 timeout 秒)
+        # expect_response 只对命中的响应取 body，不再常驻全局 response 监听
         target_url = "https://one.google.com/ai-student?g1_landing_page=75"
-        if target_url not in page.url:
-            await page.goto(target_url, wait_until="domcontentloaded", timeout=timeout * 1000)
-        
-        # 等待 API 响应 (最多 timeout 秒)
-        try:
-            await asyncio.wait_for(response_received.wait(), timeout=timeout)
-        except asyncio.TimeoutError:
-            pass # 超时没收到API，继续检查元素
-        
-        # 等待页面网络空闲（确保元素加载）
+        nav_error = None
         try:
-            await page.wait_for_load_state("networkidle", timeout=5000)
-        except:
-            pass
+            async with page.expect_response(_is_eligibility_response, timeout=timeout * 1000) as response_info:
+                if target_url not in page.url:
+                    try:
+                        await page.goto(target_url, wait_until="domcontentloaded", timeout=timeout * 1000)
+                    except Exception as e:
+                        nav_error = e
+                        raise
+            response = await response_info.value
+            try:
+                api_response_data = await response.text()
+            except Exception:
+                api_response_data = None
+        except PlaywrightTimeoutError:
+            if nav_error is not None:
+                raise
+            # 超时没收到API，继续检查元素
         
         # ============ 分析 API 响应 ============
         if api_response_data:
-            status = _parse_api_response(api_response_data)
+            status = _parse_api_response(api_response_data, only_check_subscribed)
             if status:
                 return status, None
         
+        # 等待任一终态元素出现（Google One 有长连接，networkidle 常常白等满 5 秒）
+        try:
+            await page.wait_for_selector(_ELIGIBILITY_READY_SEL, timeout=5000)
+        except Exception:
+            pass
+        
         # ============ 检测页面元素 (API没拦截到或API显示未订阅时) ============
         return await _detect_page_elements(page)
         
     except Exception as e:
         print(f"[GoogleAuth] 资格检测异常: {e}")
         return 'error', str(e)
-        
-    finally:
-        # 移除监听器
-        page.remove_listener("response", handle_response)
 
 
 # ==================== 辅助函数 ====================
 
-def _parse_api_response(response_text: str) -> Optional[str]:
-    """解析 GI6Jdd API 响应"""
+def _is_eligibility_response(response) -> bool:
+    """资格接口响应特征 rpcids=GI6Jdd"""
+    return 'rpcids=GI6Jdd' in response.url
+
+
+@lru_cache(maxsize=512)
+def _totp_for(secret: str) -> pyotp.TOTP:
+    """按密钥缓存 TOTP 对象，避免每次重新解析 base32 密钥"""
+    return pyotp.TOTP(secret)
+
+
+def _parse_api_response(response_text: str, only_check_subscribed: bool = False) -> Optional[str]:
+    """
+    @brief 解析 GI6Jdd API 响应
+    @param only_check_subscribed 为 True 时未命中订阅特征返回 'ineligible_fast'（而非 None 继续页面检测）
+    """
     try:
         # 检查订阅状态
         # 响应通常包含 JSON 数组，这里简化做字符串匹配
-        has_2tb = '2 TB' in response_text or '2TB' in response_text or '"2 TB"' in response_text
-        has_antigravity = 'Antigravity' in response_text or '"Antigravity"' in response_text
+        has_2tb = has_antigravity = False
+        for m in _API_PAT.finditer(response_text):
+            if m.group().startswith('A'):
+                has_antigravity = True
+            else:
+                has_2tb = True
+            if has_2tb and has_antigravity:
+                break
         
         if has_2tb:
             if has_antigravity:
                 return 'subscribed_antigravity'
             else:
                 return 'subscribed'
+        if only_check_subscribed:
+            return 'ineligible_fast'
         return None
     except Exception:
         return None
@@ -199,14 +293,12 @@ async def _detect_page_elements(page: Page) -> Tuple[str, Optional[str]]:
     """通过页面元素检测资格状态"""
     try:
         # 1. 检查 hSRGPd (有资格待验证 - 含有 SheerID 验证链接)
-        link_ready_locator = page.locator('[jsname="hSRGPd"]')
-        if await link_ready_locator.count() > 0 and await link_ready_locator.first.is_visible():
+        # 2. 检查 V67aGc (已验证未绑卡 - Get student offer 按钮)
+        hit = await _first_visible(page, ('[jsname="hSRGPd"]', '[jsname="V67aGc"]'))
+        if hit == 0:
             sheerid_link = await _extract_sheerid_link(page)
             return 'link_ready', sheerid_link
-        
-        # 2. 检查 V67aGc (已验证未绑卡 - Get student offer 按钮)
-        verified_locator = page.locator('[jsname="V67aGc"]')
-        if await verified_locator.count() > 0 and await verified_locator.first.is_visible():
+        if hit == 1:
             return 'verified', None
         
         # 3. 再次检查是否有 SheerID 链接 (备选方案 - 有时候jsname可能变)
@@ -215,22 +307,12 @@ async def _detect_page_elements(page: Page) -> Tuple[str, Optional[str]]:
             return 'link_ready', sheerid_link
         
         # 4. 检查是否有 "Get student offer" 相关按钮
-        offer_selectors = [
-            'button:has-text("Get student offer")',
-            'button:has-text("Get offer")',
-            '[data-action="offerDetails"]',
-        ]
-        for selector in offer_selectors:
-             if await page.locator(selector).count() > 0:
-                  return 'verified', None
-
-        # 5. 再次检查已订阅文本（防止API漏掉）
-        if await page.locator('text="Subscribed"').count() > 0 or await page.locator('text="已订阅"').count() > 0:
-             return 'subscribed', None
-
-        # 6. 已订阅页面文案（参考 bit 项目：You're already subscribed / Manage plan）
+        if await page.locator(_OFFER_CSS).count() > 0:
+            return 'verified', None
+
+        # 5. 再次检查已订阅文本（防止API漏掉），含已订阅页面文案（参考 bit 项目：You're already subscribed）
         try:
-            if await page.locator('text=/already\\s+subscribed/i').count() > 0:
+            if await page.locator(_SUBSCRIBED_TEXT_CSS).count() > 0:
                 return 'subscribed', None
         except Exception:
             pass
@@ -244,19 +326,7 @@ async def _detect_page_elements(page: Page) -> Tuple[str, Optional[str]]:
 async def _extract_sheerid_link(page: Page) -> Optional[str]:
     """提取 SheerID 验证链接"""
     try:
-        # 方法1: 查找 sheerid.com 链接
-        sheerid_locator = page.locator('a[href*="sheerid.com"]')
-        if await sheerid_locator.count() > 0:
-            href = await sheerid_locator.first.get_attribute("href")
-            if href:
-                return href
-        
-        # 方法2: 从页面内容中查找
-        content = await page.content()
-        match = re.search(r'https://[^"\']*sheerid\.com[^"\']*', content)
-        if match:
-            return match.group(0)
-        return None
+        return await page.evaluate(_SHEERID_LINK_JS) or None
     except Exception:
         return None
 
@@ -268,7 +338,7 @@ async def _extract_logged_in_email(page: Page) -> Optional[str]:
         label_locator = page.locator('a[aria-label*="Google"]').first
         if await label_locator.count() > 0:
             label = await label_locator.get_attribute('aria-label') or ""
-            match = re.search(r'[\w\.-]+@[\w\.-]+', label)
+            match = _EMAIL_RE.search(label)
             if match:
                 return match.group(0)
     except:
@@ -283,56 +353,20 @@ async def is_logged_in(page: Page) -> bool:
     return await check_google_login_by_avatar(page)
 
 async def _dismiss_post_login_prompts(page: Page) -> bool:
-    """处理登录后可能出现的安全/Passkeys 提示（Not now/Cancel/No thanks 等）"""
-    # 复用 bitbrowser-automation 的“多语言 Skip/Not now”思路：
-    # - 先用多选择器快速点击
-    # - 再用 get_by_role + regex 兜底
-    selectors = [
-        'button:has-text("Not now")',
-        '[role="button"]:has-text("Not now")',
-        'button:has-text("No thanks")',
-        '[role="button"]:has-text("No thanks")',
-        'button:has-text("Cancel")',
-        '[role="button"]:has-text("Cancel")',
-        'button:has-text("Later")',
-        '[role="button"]:has-text("Later")',
-        'button:has-text("Skip")',
-        '[role="button"]:has-text("Skip")',
-        'button:has-text("Omitir")',
-        '[role="button"]:has-text("Omitir")',
-        'button:has-text("Overslaan")',
-        '[role="button"]:has-text("Overslaan")',
-        'button:has-text("暂不")',
-        '[role="button"]:has-text("暂不")',
-        'button:has-text("取消")',
-        '[role="button"]:has-text("取消")',
-        'button:has-text("稍后")',
-        '[role="button"]:has-text("稍后")',
-        'button:has-text("跳过")',
-        '[role="button"]:has-text("跳过")',
-    ]
-
-    for selector in selectors:
-        try:
-            btn = await page.query_selector(selector)
-            if btn and await btn.is_visible():
-                await btn.click(force=True)
-                await asyncio.sleep(1)
-                return True
-        except Exception:
-            continue
-
+    """
+    @brief 处理登录后可能出现的安全/Passkeys 提示（Not now/Cancel/No thanks 等）
+    @details 复用 bitbrowser-automation 的“多语言 Skip/Not now”思路：页面内一次找到第一个命中的可见按钮，
+             再通过 locator 可信点击（只点一个，避免误关页面上其他对话框）
+    @return 是否点击了提示按钮
+    """
     try:
-        pattern = re.compile(r"Skip|Omitir|Overslaan|Not now|Later|No thanks|Cancel|暂不|取消|稍后|跳过", re.I)
-        btn = page.get_by_role("button", name=pattern).first
-        if await btn.count() > 0 and await btn.is_visible():
-            await btn.click(force=True)
-            await asyncio.sleep(1)
-            return True
+        if not await page.evaluate(_DISMISS_JS, [list(_DISMISS_LABELS), _DISMISS_MARK_ATTR]):
+            return False
+        await page.locator(f"[{_DISMISS_MARK_ATTR}]").first.click(force=True)
     except Exception:
-        pass
-
-    return False
+        return False
+    await asyncio.sleep(1)
+    return True
 
 
 async def _confirm_logged_in(page: Page, timeout: float = 10.0) -> bool:
@@ -365,19 +399,7 @@ async def ensure_google_login(page: Page, account_info: dict) -> Tuple[bool, str
     - 看不到邮箱输入框 => 视为已登录（继续后续流程）
     """
     async def _has_login_inputs() -> bool:
-        try:
-            email_box = page.locator('input[type="email"]').first
-            if await email_box.count() > 0 and await email_box.is_visible():
-                return True
-        except Exception:
-            pass
-        try:
-            pwd_box = page.locator('input[type="password"]').first
-            if await pwd_box.count() > 0 and await pwd_box.is_visible():
-                return True
-        except Exception:
-            pass
-        return False
+        return await _first_visible(page, LOGIN_INPUT_SELECTORS) >= 0
 
     # 先处理可能的登录后提示（否则可能遮挡头像导致误判）
     try:
@@ -453,7 +475,7 @@ async def google_login(page: Page, account_info: dict) -> Tuple[bool, str]:
                 )
                 if totp_input:
                     if secret:
-                        code = pyotp.TOTP(secret).now()
+                        code = _totp_for(secret).now()
                         await totp_input.fill(code)
                         await page.click("#totpNext >> button")
                     else:
@@ -471,19 +493,27 @@ async def google_login(page: Page, account_info: dict) -> Tuple[bool, str]:
                 pass
 
             await asyncio.sleep(2)
-            try:
-                for _ in range(5):
-                    dismissed = await _dismiss_post_login_prompts(page)
+            # 分段等待头像出现（Playwright 的 selector 等待不依赖 rAF，后台标签页也能触发），
+            # 每段之间继续关闭登录后提示（Passkeys 等弹窗可能在等待期间才出现）
+            for _ in range(5):
+                try:
+                    dismissed = False
+                    for _ in range(3):
+                        if not await _dismiss_post_login_prompts(page):
+                            break
+                        dismissed = True
                     if dismissed:
                         try:
                             await page.wait_for_load_state("domcontentloaded", timeout=5000)
                         except Exception:
                             pass
-                    if await check_google_login_by_avatar(page, timeout=6):
-                        return True, "登录成功"
-                    await asyncio.sleep(1)
-            except Exception:
-                pass
+                except Exception:
+                    pass
+                try:
+                    await page.wait_for_selector(_AVATAR_VISIBLE_SEL, state="visible", timeout=2000)
+                    return True, "登录成功"
+                except Exception:
+                    pass
 
             if await _confirm_logged_in(page, timeout=10):
                 return True, "登录成功"
@@ -590,16 +620,31 @@ async def full_google_detection(
     @brief 完整的 Google 检测流程 (登录 + 资格)
     @return (is_logged_in, status, sheerid_link)
     """
-    # 1. 检测登录状态
-    is_logged_in = await check_google_login_by_avatar(page, timeout=timeout)
-    
-    if not is_logged_in:
-        return False, 'not_logged_in', None
-    
-    # 2. 检测资格状态
-    status, sheerid_link = await check_google_one_status(page, timeout=timeout)
-    
-    return True, status, sheerid_link
+    # 空白页时登录检测自身会先导航到 accounts.google.com，不能与资格检测的导航并发
+    if 'about:blank' in (page.url or ''):
+        is_logged_in = await check_google_login_by_avatar(page, timeout=timeout)
+        if not is_logged_in:
+            return False, 'not_logged_in', None
+        status, sheerid_link = await check_google_one_status(page, timeout=timeout)
+        return True, status, sheerid_link
+
+    # 登录检测与资格检测并发；未登录时取消资格检测
+    login_task = asyncio.ensure_future(check_google_login_by_avatar(page, timeout=timeout))
+    status_task = asyncio.ensure_future(check_google_one_status(page, timeout=timeout))
+    try:
+        # 1. 检测登录状态
+        is_logged_in = await login_task
+        if not is_logged_in:
+            return False, 'not_logged_in', None
+
+        # 2. 检测资格状态
+        status, sheerid_link = await status_task
+        return True, status, sheerid_link
+    finally:
+        for task in (login_task, status_task):
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(login_task, status_task, return_exceptions=True)
 
 
 # ==================== 状态常量 ====================
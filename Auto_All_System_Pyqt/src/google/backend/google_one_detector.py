@@ -2,63 +2,139 @@
 Google One AI Student 页面状态检测（复用 bitbrowser-automation 思路）
 """
 
+import asyncio
+import re
 import time
+import unicodedata
+from functools import lru_cache
 from typing import Optional, Tuple
 
-from playwright.async_api import Page
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
 
 NOT_AVAILABLE_PHRASES = [
     "This offer is not available",
     "This account isn't eligible for the Google AI Pro plan",
     "This account isn’t eligible for the Google AI Pro plan",
-    "漂u 膽茫i n脿y hi峄噉 kh么ng d霉ng 膽瓢峄",
-    "Esta oferta no est谩 disponible",
+    "Ưu đãi này hiện không dùng được",
+    "Esta oferta no está disponible",
     "Cette offre n'est pas disponible",
-    "Esta oferta n茫o est谩 dispon铆vel",
+    "Esta oferta não está disponível",
     "Tawaran ini tidak tersedia",
-    "姝や紭鎯犵洰鍓嶄笉鍙敤",
-    "閫欓爡鍎儬鐩墠鐒℃硶浣跨敤",
-    "Oferta niedost臋pna",
-    "Oferta nu este disponibil膬",
-    "Die Aktion ist nicht verf眉gbar",
-    "Il'offerta non 猫 disponibile",
-    "Aceast膬 ofert膬 nu este disponibil膬",
-    "Ez az aj谩nlat nem 谩ll rendelkez茅sre",
-    "Tato nab铆dka nen铆 k dispozici",
-    "Bu teklif kullan谋lam谋yor",
+    "此优惠目前不可用",
+    "這項優惠目前無法使用",
+    "Oferta niedostępna",
+    "Oferta nu este disponibilă",
+    "Die Aktion ist nicht verfügbar",
+    "Il'offerta non è disponibile",
+    "Această ofertă nu este disponibilă",
+    "Ez az ajánlat nem áll rendelkezésre",
+    "Tato nabídka není k dispozici",
+    "Bu teklif kullanılamıyor",
 ]
 
 SUBSCRIBED_PHRASES = [
     "You're already subscribed",
-    "B岷 膽茫 膽膬ng k媒",
-    "宸茶闃?",
-    "Ya est谩s suscrito",
+    "Bạn đã đăng ký",
+    "已订阅",
+    "Ya estás suscrito",
 ]
 
 VERIFIED_UNBOUND_PHRASES = [
     "Get student offer",
-    "Nh岷璶 瓢u 膽茫i d脿nh cho sinh vi锚n",
+    "Nhận ưu đãi dành cho sinh viên",
     "Obtener oferta para estudiantes",
     "Obter oferta de estudante",
-    "鑾峰彇瀛︾敓浼樻儬",
-    "鐛插彇瀛哥敓鍎儬",
+    "获取学生优惠",
+    "獲取學生優惠",
     "Dapatkan penawaran pelajar",
 ]
 
 
+def _trie_regex(phrases) -> str:
+    """
+    把短语列表编译成前缀树形式的交替正则（公共前缀只匹配一次），
+    只用 Python 与 JS 通用的语法，页面内可直接 new RegExp(src, 'i')
+    """
+    trie: dict = {}
+    for phrase in dict.fromkeys(unicodedata.normalize("NFC", p.lower()) for p in phrases):
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return emit(trie)
+
+
+# 额外兜底：部分页面显示 “isn't eligible / not eligible” 而非 “not available”
+_NOT_ELIGIBLE_PATTERN = r"not\s+eligible|isn.?t\s+eligible"
+
+
+def _whole_line(pattern: str) -> str:
+    """
+    短语必须独占 innerText 的一行（对应原先 text="短语" 的整元素精确匹配），
+    避免说明段落/FAQ/页脚里顺带出现的短语改变状态判断；配合 'm' 标志使用
+    """
+    return r"^[ \t\u00a0]*(?:" + pattern + r")[ \t\u00a0]*$"
+
+
+# 按优先级排列的 (状态, 正则)，模块加载时构建一次；不可用短语与 not eligible 兜底合并为同一条
+# （not eligible 兜底与原先一样按子串匹配）
+_STATUS_PATTERNS = (
+    ("subscribed", _whole_line(_trie_regex(SUBSCRIBED_PHRASES))),
+    ("verified", _whole_line(_trie_regex(VERIFIED_UNBOUND_PHRASES))),
+    ("ineligible", _whole_line(_trie_regex(NOT_AVAILABLE_PHRASES)) + "|" + _NOT_ELIGIBLE_PATTERN),
+)
+
+# 在页面内轮询：按优先级匹配状态正则（逐行锚定），未命中时看是否已有 SheerID 链接；都没有返回 null 继续等待
+_STATUS_WAIT_JS = """patterns => {
+    const text = document.body ? document.body.innerText : '';
+    for (const [status, src] of patterns) {
+        if (new RegExp(src, 'im').test(text)) return { status };
+    }
+    const a = document.querySelector('a[href*="sheerid.com"]');
+    if (a) return { link: { href: a.getAttribute('href'), text: a.innerText || '' } };
+    return null;
+}"""
+_STATUS_WAIT_ARG = [list(item) for item in _STATUS_PATTERNS]
+
+# 页面内轮询间隔(毫秒)：innerText 会触发排版，不按每帧(raf)跑
+_STATUS_POLL_MS = 200
+
+# verificationId 提取：查询参数优先于 verify/ 路径（SheerID 链接里 verify/ 后面是 programId）
+_VID_PARAM_RE = re.compile(r"verificationId=([a-zA-Z0-9]+)")
+_VID_PATH_RE = re.compile(r"verify/([a-zA-Z0-9]+)")
+_VID_BARE_RE = re.compile(r"^[a-zA-Z0-9]+$")
+
+
+@lru_cache(maxsize=1024)
+def _is_student_offer_text(text: str) -> bool:
+    """链接文字翻译成英文后是否为 student offer / get offer（同一文本只请求一次翻译）"""
+    from deep_translator import GoogleTranslator
+
+    translated_text = GoogleTranslator(source="auto", target="en").translate(text).lower()
+    return "student offer" in translated_text or "get offer" in translated_text
+
+
 def extract_verification_id(link_or_id: str) -> Optional[str]:
     if not link_or_id:
         return None
-    import re
-
-    match_param = re.search(r"verificationId=([a-zA-Z0-9]+)", link_or_id)
+    match_param = _VID_PARAM_RE.search(link_or_id)
     if match_param:
         return match_param.group(1)
-    match_path = re.search(r"verify/([a-zA-Z0-9]+)", link_or_id)
+    match_path = _VID_PATH_RE.search(link_or_id)
     if match_path:
         return match_path.group(1)
-    if re.match(r"^[a-zA-Z0-9]+$", link_or_id):
+    if _VID_BARE_RE.match(link_or_id):
         return link_or_id
     return None
 
@@ -71,68 +147,43 @@ async def detect_google_one_status_dom(
     Returns:
         ('subscribed' | 'verified' | 'link_ready' | 'ineligible' | 'timeout', link_or_none)
     """
-    start = time.time()
-
-    while time.time() - start < timeout_seconds:
-        for phrase in SUBSCRIBED_PHRASES:
-            try:
-                loc = page.locator(f'text="{phrase}"').first
-                if await loc.count() > 0 and await loc.is_visible():
-                    return "subscribed", None
-            except Exception:
-                continue
-
-        for phrase in VERIFIED_UNBOUND_PHRASES:
-            try:
-                loc = page.locator(f'text="{phrase}"').first
-                if await loc.count() > 0 and await loc.is_visible():
-                    return "verified", None
-            except Exception:
-                continue
-
-        for phrase in NOT_AVAILABLE_PHRASES:
-            try:
-                loc = page.locator(f'text="{phrase}"').first
-                if await loc.count() > 0 and await loc.is_visible():
-                    return "ineligible", None
-            except Exception:
-                continue
-
-        # 额外兜底：部分页面显示 “isn't eligible / not eligible” 而非 “not available”
+    deadline = time.time() + timeout_seconds
+    result = None
+
+    # 整个等待在浏览器内完成，命中即返回，不再每秒往返一次
+    while result is None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return "timeout", None
         try:
-            loc = page.locator('text=/not\\s+eligible|isn.?t\\s+eligible/i').first
-            if await loc.count() > 0 and await loc.is_visible():
-                return "ineligible", None
+            handle = await page.wait_for_function(
+                _STATUS_WAIT_JS,
+                arg=_STATUS_WAIT_ARG,
+                polling=_STATUS_POLL_MS,
+                timeout=remaining * 1000,
+            )
+            result = await handle.json_value()
+        except PlaywrightTimeoutError:
+            return "timeout", None
         except Exception:
-            pass
+            # 页面跳转导致执行上下文销毁等，稍后重试
+            await asyncio.sleep(0.5)
 
-        link_element = page.locator('a[href*="sheerid.com"]').first
-        try:
-            if await link_element.count() > 0:
-                href = await link_element.get_attribute("href")
-                text_content = ""
-                try:
-                    text_content = (await link_element.inner_text()) or ""
-                except Exception:
-                    pass
-
-                if text_content.strip():
-                    try:
-                        from deep_translator import GoogleTranslator
-
-                        translated_text = GoogleTranslator(source="auto", target="en").translate(text_content).lower()
-                        if "student offer" in translated_text or "get offer" in translated_text:
-                            return "verified", None
-                    except Exception:
-                        pass
-
-                return "link_ready", href
-        except Exception:
-            pass
+    status = result.get("status")
+    if status:
+        return status, None
+
+    link = result.get("link") or {}
+    href = link.get("href")
+    text_content = link.get("text") or ""
 
+    # 链接文字是其他语言的 "Get student offer" 时视为已验证；翻译结果按文本缓存，且不阻塞事件循环
+    text_content = " ".join(text_content.split())
+    if text_content:
         try:
-            await page.wait_for_timeout(1000)
+            if await asyncio.to_thread(_is_student_offer_text, text_content):
+                return "verified", None
         except Exception:
             pass
 
-    return "timeout", None
+    return "link_ready", href
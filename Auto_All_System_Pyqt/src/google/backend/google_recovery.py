@@ -3,58 +3,89 @@ Google 登录时的辅助邮箱验证处理
 """
 
 import asyncio
+import re
 from typing import Optional, Callable
 
 from playwright.async_api import Page
 
 
+# 需要人工处理的人机验证页面文字（忽略大小写，一次扫描）
+_MANUAL_TEXT_PATTERNS = (
+    "Confirm you're not a robot",
+    "Confirm you’re not a robot",
+    "I'm not a robot",
+    "reCAPTCHA",
+    "captcha",
+    "不是机器人",
+    "人机验证",
+    "验证您不是机器⼈",
+)
+_MANUAL_TEXT_RE = re.compile("|".join(map(re.escape, _MANUAL_TEXT_PATTERNS)), re.IGNORECASE)
+_RECAPTCHA_SEL = 'iframe[src*="recaptcha"], iframe[title*="recaptcha"], [title*="reCAPTCHA"]'
+
+# 验证身份页面的可见文字标记
+_CHALLENGE_MARKERS = (
+    "Verify it’s you",
+    "Verify it's you",
+    "Verify your identity",
+    "Choose a way to sign in",
+    "Try another way",
+    "Confirm your recovery email",
+    "Confirm your backup email",
+    "确认您的辅助邮箱",
+    "验证身份",
+)
+_CHALLENGE_MARKERS_RE = re.compile("|".join(map(re.escape, _CHALLENGE_MARKERS)))
+
+# 命中按钮的临时标记属性（页面内找到后打标，再用 locator 点击）
+_ACTION_MARK_ATTR = "data-auto-action-hit"
+
+# 一次页面内扫描：按 关键词 -> 范围(可见弹窗优先) -> 元素类型 的优先级找第一个可见且文字包含关键词的元素，
+# 最后按 aria-label 兜底（对应 get_by_role 的可访问名称）；命中后打标并返回关键词
+_FIND_ACTION_JS = """([keywords, mark]) => {
+    const norm = s => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const visible = e => {
+        const r = e.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(e).visibility !== 'hidden';
+    };
+    document.querySelectorAll('[' + mark + ']').forEach(e => e.removeAttribute(mark));
+    const dialog = document.querySelector('[role="dialog"]');
+    const scopes = dialog && visible(dialog) ? [dialog, document] : [document];
+    const tags = ['button', '[role="button"]', 'a', 'span'];
+    const hit = (el, kw) => { el.setAttribute(mark, '1'); return kw; };
+    for (const kw of keywords) {
+        const k = norm(kw);
+        for (const scope of scopes) {
+            for (const tag of tags) {
+                for (const el of scope.querySelectorAll(tag)) {
+                    if (norm(el.textContent).includes(k) && visible(el)) return hit(el, kw);
+                }
+            }
+        }
+        for (const el of document.querySelectorAll('button[aria-label], [role="button"][aria-label]')) {
+            if (norm(el.getAttribute('aria-label')).includes(k) && visible(el)) return hit(el, kw);
+        }
+    }
+    return null;
+}"""
+
+
 async def _click_action_button(
     page: Page,
     keywords: list[str],
     log_callback: Optional[Callable] = None,
 ) -> bool:
-    selectors_by_keyword = {}
-    for keyword in keywords:
-        selectors_by_keyword[keyword] = [
-            f'button:has-text("{keyword}")',
-            f'[role="button"]:has-text("{keyword}")',
-            f'a:has-text("{keyword}")',
-            f'span:has-text("{keyword}")',
-        ]
-
-    search_scopes = []
     try:
-        dialog = await page.query_selector('[role="dialog"]')
-        if dialog and await dialog.is_visible():
-            search_scopes.append(dialog)
+        keyword = await page.evaluate(_FIND_ACTION_JS, [list(keywords), _ACTION_MARK_ATTR])
+        if not keyword:
+            return False
+        await page.locator(f"[{_ACTION_MARK_ATTR}]").first.click(force=True)
     except Exception:
-        pass
-    search_scopes.append(page)
-
-    for keyword, selectors in selectors_by_keyword.items():
-        for scope in search_scopes:
-            for selector in selectors:
-                try:
-                    btn = await scope.query_selector(selector)
-                    if btn and await btn.is_visible():
-                        await btn.click(force=True)
-                        if log_callback:
-                            log_callback(f"点击: {keyword}")
-                        await asyncio.sleep(2)
-                        return True
-                except Exception:
-                    continue
-        try:
-            role_btn = page.get_by_role("button", name=keyword)
-            if await role_btn.count() > 0 and await role_btn.first.is_visible():
-                await role_btn.first.click(force=True)
-                if log_callback:
-                    log_callback(f"点击: {keyword}")
-                await asyncio.sleep(2)
-                return True
-        except Exception:
-            pass
-    return False
+        return False
+    if log_callback:
+        log_callback(f"点击: {keyword}")
+    await asyncio.sleep(2)
+    return True
 
 
 async def detect_manual_verification(page: Page) -> bool:
@@ -64,21 +95,11 @@ async def detect_manual_verification(page: Page) -> bool:
     except Exception:
         text = ""
 
-    patterns = [
-        "Confirm you're not a robot",
-        "Confirm you’re not a robot",
-        "I'm not a robot",
-        "reCAPTCHA",
-        "captcha",
-        "不是机器人",
-        "人机验证",
-        "验证您不是机器⼈",
-    ]
-    if any(p.lower() in text.lower() for p in patterns):
+    if _MANUAL_TEXT_RE.search(text):
         return True
 
     try:
-        loc = page.locator('iframe[src*="recaptcha"], iframe[title*="recaptcha"], [title*="reCAPTCHA"]')
+        loc = page.locator(_RECAPTCHA_SEL)
         if await loc.count() > 0:
             return True
     except Exception:
@@ -98,19 +119,8 @@ async def handle_recovery_email_challenge(
     if not backup_email:
         return False
 
-    markers = [
-        "Verify it’s you",
-        "Verify it's you",
-        "Verify your identity",
-        "Choose a way to sign in",
-        "Try another way",
-        "Confirm your recovery email",
-        "Confirm your backup email",
-        "确认您的辅助邮箱",
-        "验证身份",
-    ]
     try:
-        content = await page.content()
+        content = await page.inner_text("body")
     except Exception:
         content = ""
 
@@ -119,8 +129,13 @@ async def handle_recovery_email_challenge(
             log_callback("检测到人机验证，需要人工完成")
         return False
 
-    if not any(m in content for m in markers) and "challenge" not in page.url.lower():
-        return False
+    if not _CHALLENGE_MARKERS_RE.search(content) and "challenge" not in page.url.lower():
+        # 可见文字没命中时，用验证方式列表的属性兜底
+        try:
+            if await page.locator("[data-challengetype]").count() == 0:
+                return False
+        except Exception:
+            return False
 
     if log_callback:
         log_callback("检测到验证身份页面，尝试使用辅助邮箱...")
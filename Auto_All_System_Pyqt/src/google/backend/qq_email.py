@@ -3,14 +3,23 @@
 @brief QQ邮箱IMAP读取模块
 @details 通过IMAP协议读取QQ邮箱中的Google验证码，支持自定义域名catch-all
 """
+import asyncio
+import atexit
+import base64
+import binascii
 import imaplib
 import email
 from email.header import decode_header
+from email.message import Message
+from email.parser import BytesHeaderParser
+import quopri
 import re
+import threading
 import time
-import random
+from collections import OrderedDict
+import secrets
 import string
-from typing import Optional, Tuple, Callable
+from typing import Optional, Tuple, Callable, Dict
 
 # QQ邮箱IMAP配置
 IMAP_SERVER = "imap.qq.com"
@@ -19,14 +28,28 @@ IMAP_PORT = 993
 # 自定义域名配置（catch-all转发到QQ邮箱）
 DEFAULT_CUSTOM_DOMAIN = "1238988.xyz"
 
+# 随机邮箱前缀字符集与长度
+_EMAIL_ALPHABET = string.ascii_lowercase + string.digits
+_EMAIL_PREFIX_LEN = 12
+
 # 默认QQ邮箱配置（用于接收转发的验证码）
 DEFAULT_QQ_EMAIL = "64445547@qq.com"
 DEFAULT_QQ_AUTH_CODE = "vapnuktbosfrcbaj"
 
+# Google验证码格式：6位数字；各分支按优先级排列，每个分支恰好一个捕获组
+_CODE_GROUPS = (
+    r'(?:verification code|验证码)[:\s]*(\d{6})',
+    r'(?:code is|代码是)[:\s]*(\d{6})',
+    r'<b>(\d{6})</b>',
+    r'>(\d{6})<',
+    r'\b(\d{6})\b',  # 最后尝试匹配任意6位数字
+)
+_CODE_RE = re.compile("|".join(_CODE_GROUPS), re.IGNORECASE)
+
 
 def generate_random_email(domain: str = DEFAULT_CUSTOM_DOMAIN) -> str:
     """生成随机邮箱地址"""
-    prefix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
+    prefix = ''.join(secrets.choice(_EMAIL_ALPHABET) for _ in range(_EMAIL_PREFIX_LEN))
     return f"{prefix}@{domain}"
 
 
@@ -49,18 +72,22 @@ def decode_email_header(header: str) -> str:
 
 
 def get_email_body(msg) -> str:
-    """获取邮件正文"""
+    """获取邮件正文（有 text/plain 时只解码纯文本部分，否则取 text/html）"""
     body = ""
     if msg.is_multipart():
+        parts = {"text/plain": "", "text/html": ""}
         for part in msg.walk():
             content_type = part.get_content_type()
-            if content_type == "text/plain" or content_type == "text/html":
+            if content_type in parts:
+                if content_type == "text/html" and parts["text/plain"]:
+                    continue
                 try:
                     payload = part.get_payload(decode=True)
                     charset = part.get_content_charset() or 'utf-8'
-                    body += payload.decode(charset, errors='ignore')
+                    parts[content_type] += payload.decode(charset, errors='ignore')
                 except:
                     pass
+        body = parts["text/plain"] or parts["text/html"]
     else:
         try:
             payload = msg.get_payload(decode=True)
@@ -73,20 +100,15 @@ def get_email_body(msg) -> str:
 
 def extract_google_verification_code(body: str) -> Optional[str]:
     """从邮件正文中提取Google验证码"""
-    # Google验证码格式：6位数字
-    patterns = [
-        r'(?:verification code|验证码)[:\s]*(\d{6})',
-        r'(?:code is|代码是)[:\s]*(\d{6})',
-        r'<b>(\d{6})</b>',
-        r'>(\d{6})<',
-        r'\b(\d{6})\b',  # 最后尝试匹配任意6位数字
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, body, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    return None
+    # 一次扫描找出所有候选，按分支优先级（组号越小越优先）取第一个出现的
+    best, best_rank = None, len(_CODE_GROUPS) + 1
+    for match in _CODE_RE.finditer(body):
+        rank = match.lastindex
+        if rank < best_rank:
+            best, best_rank = match.group(rank), rank
+            if rank == 1:
+                break
+    return best
 
 
 def connect_qq_email(qq_email: str, auth_code: str) -> Optional[imaplib.IMAP4_SSL]:
@@ -105,6 +127,292 @@ def connect_qq_email(qq_email: str, auth_code: str) -> Optional[imaplib.IMAP4_SS
         return None
 
 
+class IMAPClientPool:
+    """
+    @brief 按 (邮箱, 授权码) 复用已登录的 IMAP 连接，省掉每次操作的 TLS 握手 + LOGIN
+    @details 连接独占借出：acquire 取出空闲连接（NOOP 探活，失效则重连），用完 release 放回；
+             出错的连接用 discard 丢弃。每个账号最多保留一个空闲连接
+    """
+
+    def __init__(self):
+        self._idle: Dict[Tuple[str, str], imaplib.IMAP4_SSL] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, qq_email: str, auth_code: str) -> Optional[imaplib.IMAP4_SSL]:
+        """借出一个可用连接，失败返回 None"""
+        with self._lock:
+            mail = self._idle.pop((qq_email, auth_code), None)
+        if mail is not None:
+            try:
+                if mail.noop()[0] == "OK":
+                    return mail
+            except Exception:
+                pass
+            self.discard(mail)
+        return connect_qq_email(qq_email, auth_code)
+
+    def release(self, qq_email: str, auth_code: str, mail: imaplib.IMAP4_SSL) -> None:
+        """归还连接；该账号已有空闲连接时直接登出"""
+        with self._lock:
+            if (qq_email, auth_code) not in self._idle:
+                self._idle[(qq_email, auth_code)] = mail
+                return
+        self.discard(mail)
+
+    @staticmethod
+    def discard(mail: imaplib.IMAP4_SSL) -> None:
+        """丢弃（登出）连接"""
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
+    def close_all(self) -> None:
+        """登出全部空闲连接（进程退出时调用）"""
+        with self._lock:
+            conns = list(self._idle.values())
+            self._idle.clear()
+        for mail in conns:
+            self.discard(mail)
+
+
+_imap_pool = IMAPClientPool()
+atexit.register(_imap_pool.close_all)
+
+
+def _select_inbox(mail: imaplib.IMAP4_SSL) -> None:
+    """复用连接已选中邮箱时不再重复 SELECT（服务器每次 SELECT 都会重新扫描邮箱）"""
+    if mail.state != "SELECTED":
+        mail.select("INBOX")
+
+
+_IMAP_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _fetch_part(mail: imaplib.IMAP4_SSL, uid: str, section: str) -> Optional[bytes]:
+    """按 UID 取邮件的指定部分（HEADER/TEXT），使用 BODY.PEEK 不改变已读状态"""
+    status, data = mail.uid("FETCH", uid, f"(BODY.PEEK[{section}])")
+    if status != "OK" or not data or not isinstance(data[0], tuple):
+        return None
+    return data[0][1]
+
+
+# 可能包含原始收件人的邮件头（catch-all 转发后 To 可能不是目标邮箱）
+_RECIPIENT_HEADERS = ('To', 'Delivered-To', 'X-Original-To', 'Envelope-To', 'X-Forwarded-To', 'Cc', 'Bcc')
+
+# 已解析邮件缓存：(邮箱, UID) -> (邮件头, 正文或 None)；多个账号轮询同一 catch-all 收件箱时不重复下载/解码
+_MESSAGE_CACHE_SIZE = 512
+_message_cache: "OrderedDict[Tuple[str, str], Tuple[Message, Optional[str]]]" = OrderedDict()
+_message_cache_lock = threading.Lock()
+
+
+def _is_code_subject(subject: str) -> bool:
+    """主题是否像验证码邮件"""
+    subject = subject.lower()
+    return any(kw in subject for kw in ['verification', 'verify', '验证', 'code'])
+
+
+# 邮件头解析器（只解析头部，不构建 MIME 结构）
+_HEADER_PARSER = BytesHeaderParser()
+
+
+def _decode_single_part(headers: Message, text_bytes: bytes) -> Optional[str]:
+    """
+    @brief 非 multipart 邮件直接按邮件头里的传输编码和字符集解码正文，不再构建 Message
+    @return 正文；未知编码/字符集返回 None（由调用方走完整解析）
+    """
+    encoding = headers.get("Content-Transfer-Encoding", "").strip().lower()
+    try:
+        if encoding == "base64":
+            data = base64.b64decode(text_bytes)
+        elif encoding == "quoted-printable":
+            data = quopri.decodestring(text_bytes)
+        elif encoding in ("", "7bit", "8bit", "binary"):
+            data = text_bytes
+        else:
+            return None
+        return data.decode(headers.get_content_charset() or 'utf-8', errors='ignore')
+    except (binascii.Error, LookupError, ValueError):
+        return None
+
+
+def _load_message(mail: imaplib.IMAP4_SSL, qq_email: str, uid: str) -> Optional[Tuple[Message, Optional[str]]]:
+    """
+    @brief 按 UID 读取邮件：先取邮件头，主题像验证码邮件才取正文
+    @return (邮件头, 正文)；主题不匹配时正文为 None；读取失败返回 None（不缓存）
+    """
+    key = (qq_email, uid)
+    with _message_cache_lock:
+        cached = _message_cache.get(key)
+        if cached is not None:
+            _message_cache.move_to_end(key)
+            return cached
+
+    # BODY.PEEK 不会把邮件标记为已读
+    header_bytes = _fetch_part(mail, uid, "HEADER")
+    if header_bytes is None:
+        return None
+    msg = _HEADER_PARSER.parsebytes(header_bytes)
+
+    body = None
+    if _is_code_subject(decode_email_header(msg.get("Subject", ""))):
+        # 正文与邮件头拼回完整邮件解析
+        text_bytes = _fetch_part(mail, uid, "TEXT")
+        if text_bytes is None:
+            return None
+        if not msg.is_multipart() and msg.get_content_maintype() == "text":
+            body = _decode_single_part(msg, text_bytes)
+        if body is None:
+            body = get_email_body(email.message_from_bytes(header_bytes + text_bytes))
+
+    with _message_cache_lock:
+        _message_cache[key] = (msg, body)
+        if len(_message_cache) > _MESSAGE_CACHE_SIZE:
+            _message_cache.popitem(last=False)
+    return msg, body
+
+
+def _imap_since_date() -> str:
+    """IMAP SINCE 日期（往前多留一天，避免服务器时区与本地不同漏掉当天邮件；月份固定英文，不受 locale 影响）"""
+    t = time.localtime(time.time() - 86400)
+    return f"{t.tm_mday:02d}-{_IMAP_MONTHS[t.tm_mon - 1]}-{t.tm_year}"
+
+
+# Python 3.14+ 的 imaplib 自带 IDLE（IMAP4.idle）；更早的版本没有公开接口，直接退回 NOOP 轮询
+_HAS_IMAP_IDLE = hasattr(imaplib.IMAP4, "idle")
+
+
+def _idle_wait(mail: imaplib.IMAP4_SSL, timeout: float) -> Optional[bool]:
+    """
+    @brief 通过 IMAP IDLE (RFC 2177) 等待服务器推送新邮件
+    @param mail 已 SELECT 收件箱的连接
+    @param timeout 最长等待秒数（RFC 要求 29 分钟内重新发起 IDLE，调用方应传更短的值）
+    @return True=收到新邮件通知(EXISTS)，False=超时，None=不支持或服务器拒绝 IDLE
+    """
+    if not _HAS_IMAP_IDLE:
+        return None
+    try:
+        # 退出 with 时 imaplib 自动发送 DONE 并读完 IDLE 的结束响应
+        with mail.idle(duration=timeout) as idler:
+            for typ, _ in idler:
+                if typ == "EXISTS":
+                    return True
+    except imaplib.IMAP4.abort:
+        raise
+    except imaplib.IMAP4.error:
+        return None
+    return False
+
+
+class _CodePoller:
+    """
+    @brief 单次“等待验证码”的轮询状态（已检查的 UID、已处理完的 UID 水位），与连接无关，重连后继续沿用
+    @details last_uid 只推进到“它及之前的搜索结果都已处理完”的位置：取信失败/抛异常的邮件下轮仍会被搜到
+    """
+
+    def __init__(self, qq_email: str, target_email: str, log: Callable):
+        self.qq_email = qq_email
+        self.target_email = target_email
+        self.log = log
+        self.checked_uids = set()
+        self.last_uid = 0
+
+    def poll(self, mail: imaplib.IMAP4_SSL) -> Optional[str]:
+        """
+        @brief 搜索并检查一轮新邮件；找到验证码时删除该邮件并返回验证码
+        @return 验证码；本轮没有返回 None；IMAP 出错直接抛出由调用方重连
+        """
+        target_email = self.target_email
+
+        # 在服务器端过滤来自Google的邮件：首次看近期（不限未读，邮件可能已被其他客户端打开），之后只看水位之后的 UID
+        if self.last_uid:
+            criteria = [f"UID {self.last_uid + 1}:*", "FROM", '"google.com"']
+        else:
+            criteria = ["FROM", '"google.com"', "SINCE", _imap_since_date()]
+        if target_email:
+            criteria += ["TO", f'"{target_email}"']
+        
+        status, messages = mail.uid("SEARCH", None, *criteria)
+        if status != "OK":
+            return None
+        
+        # "UID n:*" 在没有新邮件时也会返回当前最大 UID，需要本地再过滤一次
+        new_uids = sorted(int(u) for u in messages[0].split() if int(u) > self.last_uid)
+        try:
+            return self._check(mail, new_uids)
+        finally:
+            self._advance(new_uids)
+
+    def _advance(self, new_uids) -> None:
+        """水位推进到连续已处理的最大 UID（遇到第一个未处理的就停）"""
+        for uid_num in new_uids:
+            if str(uid_num) not in self.checked_uids:
+                break
+            self.last_uid = uid_num
+
+    def _check(self, mail: imaplib.IMAP4_SSL, new_uids) -> Optional[str]:
+        """逐封检查（最新的优先）；处理完的 UID 记入 checked_uids，取信失败的留到下一轮"""
+        target_email = self.target_email
+        checked_uids = self.checked_uids
+        # 超出最近20封的旧邮件不再检查，直接视为已处理，避免水位卡住
+        checked_uids.update(str(u) for u in new_uids[:-20])
+
+        # 从最新的邮件开始检查
+        for uid_num in reversed(new_uids[-20:]):  # 只检查最近20封
+            uid = str(uid_num)
+            
+            if uid in checked_uids:
+                continue
+            
+            # 先只取邮件头，主题像验证码邮件才取正文（同一封邮件的解析结果跨调用缓存）
+            loaded = _load_message(mail, self.qq_email, uid)
+            if loaded is None:
+                continue
+            msg, body = loaded
+            if body is None:
+                checked_uids.add(uid)
+                continue
+            
+            # 如果指定了目标邮箱，检查收件人是否匹配
+            if target_email:
+                # 多个可能包含原始收件人的头字段拼成一个串一次匹配；头里没有再查正文
+                target_lower = target_email.lower()
+                recipients = "\n".join(
+                    str(v) for h in _RECIPIENT_HEADERS for v in msg.get_all(h, [])
+                ).lower()
+                if target_lower not in recipients and target_lower not in body.lower():
+                    checked_uids.add(uid)
+                    continue
+            
+            code = extract_google_verification_code(body)
+            
+            if code:
+                self.log(f"✅ 找到验证码: {code}" + (f" (目标: {target_email})" if target_email else ""))
+                
+                # 删除已读取的验证码邮件
+                try:
+                    mail.uid("STORE", uid, '+FLAGS', '\\Deleted')
+                    mail.expunge()
+                    self.log("📧 验证码邮件已删除")
+                except Exception as del_e:
+                    pass  # 删除失败不影响主流程
+                
+                checked_uids.add(uid)
+                return code
+            
+            checked_uids.add(uid)
+        return None
+
+
+def _make_logger(log_callback: Optional[Callable]) -> Callable:
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+        else:
+            print(f"[QQEmail] {msg}")
+    return log
+
+
 def wait_for_google_verification_code(
     qq_email: str,
     auth_code: str,
@@ -124,105 +432,123 @@ def wait_for_google_verification_code(
     @param log_callback 日志回调
     @return (success, code_or_error)
     """
-    def log(msg):
-        if log_callback:
-            log_callback(msg)
-        else:
-            print(f"[QQEmail] {msg}")
+    log = _make_logger(log_callback)
     
     start_time = time.time()
-    checked_uids = set()
+    poller = _CodePoller(qq_email, target_email, log)
+    # 整个等待过程复用一个连接（从连接池借出）；出错时才重连
+    mail = None
+    use_idle = False
     
-    while time.time() - start_time < timeout_seconds:
-        try:
-            mail = connect_qq_email(qq_email, auth_code)
-            if not mail:
-                log("连接QQ邮箱失败，重试...")
-                time.sleep(poll_interval)
-                continue
-            
-            # 选择收件箱
-            mail.select("INBOX")
-            
-            # 搜索来自Google的邮件
-            search_criteria = '(FROM "google.com")'
-            if target_email:
-                search_criteria = f'(FROM "google.com" TO "{target_email}")'
-            
-            status, messages = mail.search(None, search_criteria)
-            if status != "OK":
-                mail.logout()
-                time.sleep(poll_interval)
-                continue
-            
-            email_ids = messages[0].split()
-            
-            # 从最新的邮件开始检查
-            for email_id in reversed(email_ids[-20:]):  # 只检查最近20封
-                uid = email_id.decode() if isinstance(email_id, bytes) else str(email_id)
+    try:
+        while time.time() - start_time < timeout_seconds:
+            try:
+                if mail is None:
+                    mail = _imap_pool.acquire(qq_email, auth_code)
+                    if not mail:
+                        log("连接QQ邮箱失败，重试...")
+                        time.sleep(poll_interval)
+                        continue
+                    
+                    # 选择收件箱
+                    _select_inbox(mail)
+                    use_idle = _HAS_IMAP_IDLE and "IDLE" in mail.capabilities
                 
-                if uid in checked_uids:
-                    continue
+                code = poller.poll(mail)
+                if code:
+                    return True, code
                 
-                status, msg_data = mail.fetch(email_id, "(RFC822)")
-                if status != "OK":
-                    continue
+                elapsed = int(time.time() - start_time)
+                remaining = timeout_seconds - elapsed
+                log(f"等待验证码邮件... ({remaining}秒剩余)")
+                if remaining <= 0:
+                    break
                 
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
+                # 服务器支持 IDLE 时等待推送（新邮件到达立即唤醒），否则退回定时轮询
+                if use_idle and _idle_wait(mail, min(29, remaining)) is None:
+                    use_idle = False
+                if not use_idle:
+                    time.sleep(poll_interval)
+                    mail.noop()
                 
-                # 如果指定了目标邮箱，检查收件人是否匹配
-                if target_email:
-                    # 检查多个可能包含原始收件人的头字段
-                    recipients = []
-                    for header in ['To', 'Delivered-To', 'X-Original-To', 'Envelope-To', 'X-Forwarded-To']:
-                        val = msg.get(header, '')
-                        if val:
-                            recipients.append(val.lower())
-                    
-                    # 也检查邮件正文中是否包含目标邮箱
-                    body_text = get_email_body(msg).lower()
-                    
-                    target_lower = target_email.lower()
-                    if not any(target_lower in r for r in recipients) and target_lower not in body_text:
-                        checked_uids.add(uid)
+            except Exception as e:
+                log(f"读取邮件出错: {e}")
+                # 连接可能已失效，丢弃后下一轮重连
+                if mail is not None:
+                    _imap_pool.discard(mail)
+                    mail = None
+                time.sleep(poll_interval)
+    finally:
+        if mail is not None:
+            _imap_pool.release(qq_email, auth_code, mail)
+    
+    return False, "等待验证码超时"
+
+
+async def wait_for_google_verification_code_async(
+    qq_email: str,
+    auth_code: str,
+    target_email: str = "",
+    timeout_seconds: int = 120,
+    poll_interval: int = 5,
+    log_callback: Optional[Callable] = None
+) -> Tuple[bool, str]:
+    """
+    @brief wait_for_google_verification_code 的异步版本
+    @details 每个阻塞的 IMAP 步骤放到线程池执行，轮询间隔用 asyncio.sleep，不阻塞事件循环上的其他任务
+    @return (success, code_or_error)
+    """
+    log = _make_logger(log_callback)
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds
+    poller = _CodePoller(qq_email, target_email, log)
+    mail = None
+    use_idle = False
+    
+    try:
+        while loop.time() < deadline:
+            try:
+                if mail is None:
+                    mail = await asyncio.to_thread(_imap_pool.acquire, qq_email, auth_code)
+                    if not mail:
+                        log("连接QQ邮箱失败，重试...")
+                        await asyncio.sleep(poll_interval)
                         continue
+                    await asyncio.to_thread(_select_inbox, mail)
+                    use_idle = _HAS_IMAP_IDLE and "IDLE" in mail.capabilities
                 
-                # 检查主题
-                subject = decode_email_header(msg.get("Subject", ""))
+                code = await asyncio.to_thread(poller.poll, mail)
+                if code:
+                    return True, code
                 
-                # 检查是否是验证码邮件
-                if any(kw in subject.lower() for kw in ['verification', 'verify', '验证', 'code']):
-                    body = get_email_body(msg)
-                    code = extract_google_verification_code(body)
-                    
-                    if code:
-                        log(f"✅ 找到验证码: {code}" + (f" (目标: {target_email})" if target_email else ""))
-                        
-                        # 删除已读取的验证码邮件
-                        try:
-                            mail.store(email_id, '+FLAGS', '\\Deleted')
-                            mail.expunge()
-                            log("📧 验证码邮件已删除")
-                        except Exception as del_e:
-                            pass  # 删除失败不影响主流程
-                        
-                        mail.logout()
-                        return True, code
+                remaining = int(deadline - loop.time())
+                log(f"等待验证码邮件... ({remaining}秒剩余)")
+                if remaining <= 0:
+                    break
                 
-                checked_uids.add(uid)
-            
-            mail.logout()
-            
-            elapsed = int(time.time() - start_time)
-            remaining = timeout_seconds - elapsed
-            log(f"等待验证码邮件... ({remaining}秒剩余)")
-            
-            time.sleep(poll_interval)
-            
-        except Exception as e:
-            log(f"读取邮件出错: {e}")
-            time.sleep(poll_interval)
+                if use_idle and await asyncio.to_thread(_idle_wait, mail, min(29, remaining)) is None:
+                    use_idle = False
+                if not use_idle:
+                    await asyncio.sleep(poll_interval)
+                    await asyncio.to_thread(mail.noop)
+                
+            except Exception as e:
+                log(f"读取邮件出错: {e}")
+                if mail is not None:
+                    await asyncio.to_thread(_imap_pool.discard, mail)
+                    mail = None
+                await asyncio.sleep(poll_interval)
+    except BaseException:
+        # 被取消等情况下线程池里可能仍在用这个连接（如 IDLE 中），状态未知，不能放回池里；
+        # 在线程池里登出，不阻塞事件循环
+        if mail is not None:
+            loop.run_in_executor(None, _imap_pool.discard, mail)
+            mail = None
+        raise
+    finally:
+        if mail is not None:
+            _imap_pool.release(qq_email, auth_code, mail)
     
     return False, "等待验证码超时"
 
@@ -240,17 +566,17 @@ def get_latest_google_code(
     @param max_age_minutes 邮件最大年龄（分钟）
     @return (success, code_or_error)
     """
+    mail = _imap_pool.acquire(qq_email, auth_code)
+    if not mail:
+        return False, "连接QQ邮箱失败"
+    
     try:
-        mail = connect_qq_email(qq_email, auth_code)
-        if not mail:
-            return False, "连接QQ邮箱失败"
-        
-        mail.select("INBOX")
+        _select_inbox(mail)
         
         # 搜索来自Google的邮件
         status, messages = mail.search(None, '(FROM "google.com")')
         if status != "OK":
-            mail.logout()
+            _imap_pool.release(qq_email, auth_code, mail)
             return False, "搜索邮件失败"
         
         email_ids = messages[0].split()
@@ -270,18 +596,19 @@ def get_latest_google_code(
             
             subject = decode_email_header(msg.get("Subject", ""))
             
-            if any(kw in subject.lower() for kw in ['verification', 'verify', '验证', 'code']):
+            if _is_code_subject(subject):
                 body = get_email_body(msg)
                 code = extract_google_verification_code(body)
                 
                 if code:
-                    mail.logout()
+                    _imap_pool.release(qq_email, auth_code, mail)
                     return True, code
         
-        mail.logout()
+        _imap_pool.release(qq_email, auth_code, mail)
         return False, "未找到验证码邮件"
         
     except Exception as e:
+        _imap_pool.discard(mail)
         return False, f"读取邮件出错: {e}"
 
 
@@ -293,8 +620,13 @@ import os
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "qq_email_config.json")
 
 
+# 已加载的配置：(文件 mtime_ns, 文件大小, (qq_email, auth_code))；文件被 GUI 或其他进程改写后 mtime 变化即重新读取
+_config_cache: Optional[Tuple[int, int, Tuple[str, str]]] = None
+
+
 def save_qq_email_config(qq_email: str, auth_code: str) -> bool:
     """保存QQ邮箱配置"""
+    global _config_cache
     try:
         os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
@@ -306,26 +638,39 @@ def save_qq_email_config(qq_email: str, auth_code: str) -> bool:
     except Exception as e:
         print(f"保存配置失败: {e}")
         return False
+    finally:
+        _config_cache = None
 
 
 def load_qq_email_config() -> Tuple[str, str]:
-    """加载QQ邮箱配置"""
+    """加载QQ邮箱配置（文件未变化时复用上次读取的结果）"""
+    global _config_cache
     try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get("qq_email", ""), config.get("auth_code", "")
+        st = os.stat(CONFIG_FILE)
+    except OSError:
+        # 文件不存在不缓存，之后保存的配置能立即读到
+        return ("", "")
+    cached = _config_cache
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        config = (data.get("qq_email", ""), data.get("auth_code", ""))
     except:
-        pass
-    return "", ""
+        # 读取失败不缓存，下次再试
+        return ("", "")
+    _config_cache = (st.st_mtime_ns, st.st_size, config)
+    return config
 
 
 def test_qq_email_connection(qq_email: str, auth_code: str) -> Tuple[bool, str]:
     """测试QQ邮箱连接"""
     try:
-        mail = connect_qq_email(qq_email, auth_code)
+        # 测试通过的连接放回连接池，紧接着的收码可直接复用
+        mail = _imap_pool.acquire(qq_email, auth_code)
         if mail:
-            mail.logout()
+            _imap_pool.release(qq_email, auth_code, mail)
             return True, "连接成功"
         return False, "连接失败"
     except Exception as e:
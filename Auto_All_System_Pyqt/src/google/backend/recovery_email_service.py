@@ -5,14 +5,15 @@
 """
 import asyncio
 import os
+import re
 import tempfile
 import time
 from typing import Tuple, Optional, Callable
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import async_playwright, Page, Locator
 
 from .temp_email import create_temp_email, wait_for_verification_code
 from .qq_email import (
-    wait_for_google_verification_code as qq_wait_code,
+    wait_for_google_verification_code_async as qq_wait_code_async,
     load_qq_email_config,
     test_qq_email_connection,
     generate_random_email,
@@ -23,14 +24,107 @@ from .qq_email import (
 
 RECOVERY_EMAIL_URL = "https://myaccount.google.com/recovery/email"
 
+# 按钮/输入框候选：每组合成一个 CSS 并集（:visible 由 Playwright 过滤），一次往返取第一个可见元素；
+# 组之间按优先级（对话框内优先）
+_PASSWORD_NEXT_SEL = (
+    'button:has-text("Next"):visible, button:has-text("下一步"):visible, '
+    '#passwordNext button:visible, button[type="submit"]:visible'
+)
+_TOTP_NEXT_SEL = (
+    'button:has-text("Next"):visible, button:has-text("Verify"):visible, #totpNext button:visible'
+)
+_EDIT_BUTTON_SEL = 'button[aria-label*="Edit" i]:visible, [role="button"][aria-label*="Edit" i]:visible'
+_SAVE_BUTTON_SELS = (
+    '[role="dialog"] button:has-text("Save"):visible, [role="dialog"] button:has-text("保存"):visible',
+    'button:has-text("Save"):visible, button:has-text("保存"):visible, [role="button"]:has-text("Save"):visible',
+)
+_VERIFY_BUTTON_SELS = (
+    '[role="dialog"] button:has-text("Verify"):visible, [role="dialog"] button:has-text("验证"):visible',
+    'button:has-text("Verify"):visible, button:has-text("验证"):visible, [role="button"]:has-text("Verify"):visible',
+)
+_CODE_INPUT_SELS = (
+    '[role="dialog"] input[type="text"]:visible, [role="dialog"] input[type="tel"]:visible',
+    '[role="dialog"] input:visible',
+    'input[aria-label*="code"]:visible, input[aria-label*="验证码"]:visible, input[placeholder*="code"]:visible',
+)
+
+# "Your recovery email" 卡片（按优先级逐个尝试：并集取 .first 是按 DOM 顺序，会先命中最外层包裹 div）
+# 及卡片内的 svg 图标按钮（aria-label 缺失时的备选）
+_RECOVERY_CARD_SELS = (
+    'div:has-text("Your recovery email")',
+    'div:has-text("recovery email")',
+    '[data-settingid*="RECOVERY"]',
+)
+_CARD_ICON_BUTTON_SEL = 'button:has(svg):visible'
+
+# 页面内（非弹窗）邮箱输入框
+_EMAIL_INPUT_SEL = ", ".join(f"{sel}:visible" for sel in (
+    'input[type="email"]',
+    'input[autocomplete="email"]',
+    'input[type="text"][aria-label*="email" i]:not([aria-label*="search" i])',
+    'input[type="text"][placeholder*="email" i]',
+    'input[type="text"][aria-label*="邮箱"]:not([aria-label*="搜索"])',
+    'input[type="text"][placeholder*="邮箱"]',
+    'input[aria-label*="email" i]:not([aria-label*="search" i])',
+    'input[aria-label*="邮箱"]:not([aria-label*="搜索"])',
+))
+
+# 辅助邮箱弹窗的标题文字（用于在多个 dialog 中挑出目标弹窗）
+_DIALOG_TEXT_RE = re.compile(r"set up recovery email|recovery email|辅助邮箱|恢复邮箱", re.I)
+
+# 弹窗内邮箱输入框：按优先级逐个等待（该输入框经常没有 aria-label/placeholder/type=email）
+_DIALOG_INPUT_SELS = (
+    'input[type="email"]',
+    'input[aria-label*="recovery" i]',
+    'input[placeholder*="email" i]',
+    'input[autocomplete="email"]',
+    'input[type="text"]',
+    'textarea',
+    'input:not([type="hidden"])',
+)
+
+# 点击编辑后的下一状态：可见对话框或密码验证框
+_EDIT_RESULT_SEL = '[role="dialog"]:visible, input[type="password"]:visible'
+
+# 验证码对话框：必须是可见的 [role=dialog] 且其文字匹配（页面其他位置出现同样文字不算）；
+# innerText 会触发排版，按 200ms 轮询而不是每帧
+_VERIFY_DIALOG_JS = """() => Array.from(document.querySelectorAll('[role="dialog"]')).some(d =>
+  (d.checkVisibility ? d.checkVisibility({ checkVisibilityCSS: true })
+    : getComputedStyle(d).visibility !== 'hidden' && d.getClientRects().length > 0)
+  && /Verify your recovery email|Verification code/.test(d.innerText || ''))"""
+_TEXT_POLL_MS = 200
+
+# 页面已可操作：加载完成且出现辅助邮箱主体/弹窗/密码或2FA输入框之一（与 networkidle 竞速）
+_PAGE_READY_JS = """() => document.readyState === 'complete' && !!document.querySelector(
+  '[data-help-context="RECOVERY_EMAIL_SCREEN"], [role="dialog"], input[type="password"], input[name="totpPin"]'
+)"""
+
+# 单个 locator 的存在+可见判断（evaluate_all 不会自动等待元素出现；可见性口径同 Playwright：不看 opacity）
+_FIRST_VISIBLE_JS = """els => {
+  const el = els[0];
+  if (!el) return false;
+  if (el.checkVisibility) return el.checkVisibility({ checkVisibilityCSS: true });
+  const style = window.getComputedStyle(el);
+  return style.visibility !== 'hidden' && el.getClientRects().length > 0;
+}"""
+
 # 调试目录
 DEBUG_DIR = os.path.join(tempfile.gettempdir(), "recovery_email_debug")
-os.makedirs(DEBUG_DIR, exist_ok=True)
+# 设置环境变量 RECOVERY_DEBUG 才在失败时保存截图/HTML（截图最长等 10 秒，会拖慢失败返回）
+_DEBUG_ENABLED = bool(os.environ.get("RECOVERY_DEBUG"))
+
+
+def _write_text(path: str, content: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
 
 
 async def _save_debug_info(page: Page, step: str, browser_id: str = ""):
-    """保存调试截图和HTML"""
+    """保存调试截图和HTML（未开启 RECOVERY_DEBUG 时直接返回）"""
+    if not _DEBUG_ENABLED:
+        return None, None
     try:
+        os.makedirs(DEBUG_DIR, exist_ok=True)
         timestamp = int(time.time())
         prefix = f"{browser_id[:8]}_" if browser_id else ""
         
@@ -41,8 +135,8 @@ async def _save_debug_info(page: Page, step: str, browser_id: str = ""):
         # 保存HTML
         html_path = os.path.join(DEBUG_DIR, f"{prefix}{step}_{timestamp}.html")
         content = await page.content()
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        # 页面 HTML 可达数 MB，写盘放到线程池，避免阻塞其他并发浏览器的事件循环
+        await asyncio.to_thread(_write_text, html_path, content)
         
         return png_path, html_path
     except Exception as e:
@@ -50,6 +144,26 @@ async def _save_debug_info(page: Page, step: str, browser_id: str = ""):
         return None, None
 
 
+async def _first_visible(scope, *selectors: str) -> Optional[Locator]:
+    """按优先级依次尝试并集 selector，返回第一个可见元素（每组一次 count 往返）"""
+    for sel in selectors:
+        try:
+            loc = scope.locator(sel).first
+            if await loc.count() > 0:
+                return loc
+        except Exception:
+            continue
+    return None
+
+
+async def _is_visible(loc: Locator) -> bool:
+    """locator 的第一个元素是否存在且可见（一次往返，代替 count() + is_visible()）"""
+    try:
+        return await loc.first.evaluate_all(_FIRST_VISIBLE_JS)
+    except Exception:
+        return False
+
+
 async def _handle_password_verification(page: Page, account_info: dict, log: Callable) -> bool:
     """处理密码/2FA身份验证"""
     import pyotp
@@ -66,7 +180,7 @@ async def _handle_password_verification(page: Page, account_info: dict, log: Cal
                 '#identifierNext >> button, button:has-text("Next"), button:has-text("下一步"), '
                 '[role="button"]:has-text("Next"), [role="button"]:has-text("下一步"), button[type="submit"]'
             ).first
-            if await next_loc.count() > 0 and await next_loc.is_visible():
+            if await _is_visible(next_loc):
                 await next_loc.click(force=True)
                 await asyncio.sleep(2)
     except Exception:
@@ -76,28 +190,20 @@ async def _handle_password_verification(page: Page, account_info: dict, log: Cal
     try:
         # 检测密码输入框
         pwd_input = page.locator('input[type="password"]').first
-        if await pwd_input.count() > 0 and await pwd_input.is_visible():
+        if await _is_visible(pwd_input):
             log("检测到密码验证页面，输入密码...")
             await pwd_input.fill(password)
             await asyncio.sleep(0.5)
             handled = True
             
             # 点击 Next/下一步
-            next_selectors = [
-                'button:has-text("Next")',
-                'button:has-text("下一步")',
-                '#passwordNext button',
-                'button[type="submit"]',
-            ]
-            for sel in next_selectors:
+            btn = await _first_visible(page, _PASSWORD_NEXT_SEL)
+            if btn is not None:
                 try:
-                    btn = page.locator(sel).first
-                    if await btn.count() > 0 and await btn.is_visible():
-                        await btn.click()
-                        log("✅ 已点击下一步")
-                        break
+                    await btn.click()
+                    log("✅ 已点击下一步")
                 except:
-                    continue
+                    pass
             
             await asyncio.sleep(3)
     except Exception as e:
@@ -106,7 +212,7 @@ async def _handle_password_verification(page: Page, account_info: dict, log: Cal
     # 检查是否需要2FA
     try:
         totp_input = page.locator('input[name="totpPin"], input[type="tel"][autocomplete="one-time-code"]').first
-        if await totp_input.count() > 0 and await totp_input.is_visible():
+        if await _is_visible(totp_input):
             if secret:
                 log("检测到2FA验证，输入验证码...")
                 code = pyotp.TOTP(secret).now()
@@ -115,15 +221,13 @@ async def _handle_password_verification(page: Page, account_info: dict, log: Cal
                 handled = True
                 
                 # 点击验证
-                for sel in ['button:has-text("Next")', 'button:has-text("Verify")', '#totpNext button']:
+                btn = await _first_visible(page, _TOTP_NEXT_SEL)
+                if btn is not None:
                     try:
-                        btn = page.locator(sel).first
-                        if await btn.count() > 0 and await btn.is_visible():
-                            await btn.click()
-                            log("✅ 已提交2FA")
-                            break
+                        await btn.click()
+                        log("✅ 已提交2FA")
                     except:
-                        continue
+                        pass
                 
                 await asyncio.sleep(3)
             else:
@@ -140,8 +244,12 @@ async def _wait_recovery_email_content(page: Page, log: Callable, timeout_s: flo
         await page.wait_for_function(
             """
             () => {
+              // 原生 checkVisibility 不强制完整样式计算（不看 opacity，口径同 Playwright）；旧内核回退到 computedStyle + getClientRects
               const isVisible = (el) => {
                 if (!el) return false;
+                if (el.checkVisibility) {
+                  return el.checkVisibility({ checkVisibilityCSS: true });
+                }
                 const style = window.getComputedStyle(el);
                 if (!style) return false;
                 if (style.display === 'none' || style.visibility === 'hidden') return false;
@@ -175,15 +283,30 @@ async def _wait_recovery_email_content(page: Page, log: Callable, timeout_s: flo
 
 
 async def _settle_page(page: Page, timeout_ms: int = 20000) -> None:
-    """尽量等待页面完成导航/渲染（不使用固定 sleep）"""
+    """
+    尽量等待页面完成导航/渲染（不使用固定 sleep）
+    Google 页面常驻长连接，networkidle 经常等满超时；DOM 就绪判断先成功就不再等 networkidle
+    """
     try:
         await page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
     except Exception:
         pass
+
+    pending = {
+        asyncio.ensure_future(page.wait_for_function(_PAGE_READY_JS, timeout=timeout_ms)),
+        asyncio.ensure_future(page.wait_for_load_state("networkidle", timeout=timeout_ms)),
+    }
     try:
-        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
-    except Exception:
-        pass
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # 任意一个成功即可；失败（超时/导航中断）的继续等另一个
+            if any(t.exception() is None for t in done):
+                break
+    finally:
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
 
 
 async def _wait_after_edit_action(page: Page, timeout_ms: int = 25000) -> None:
@@ -197,8 +320,12 @@ async def _wait_after_edit_action(page: Page, timeout_ms: int = 25000) -> None:
         await page.wait_for_function(
             """
             () => {
+              // 原生 checkVisibility 不强制完整样式计算（不看 opacity，口径同 Playwright）；旧内核回退到 computedStyle + getClientRects
               const isVisible = (el) => {
                 if (!el) return false;
+                if (el.checkVisibility) {
+                  return el.checkVisibility({ checkVisibilityCSS: true });
+                }
                 const style = window.getComputedStyle(el);
                 if (!style) return false;
                 if (style.display === 'none' || style.visibility === 'hidden') return false;
@@ -265,19 +392,6 @@ async def _ensure_recovery_email_page(page: Page, account_info: dict, log: Calla
             await asyncio.sleep(1.5)
 
 
-def _email_input_selectors() -> list:
-    return [
-        'input[type="email"]',
-        'input[autocomplete="email"]',
-        'input[type="text"][aria-label*="email" i]:not([aria-label*="search" i])',
-        'input[type="text"][placeholder*="email" i]',
-        'input[type="text"][aria-label*="邮箱"]:not([aria-label*="搜索"])',
-        'input[type="text"][placeholder*="邮箱"]',
-        'input[aria-label*="email" i]:not([aria-label*="search" i])',
-        'input[aria-label*="邮箱"]:not([aria-label*="搜索"])',
-    ]
-
-
 async def change_recovery_email(
     page: Page,
     account_info: dict,
@@ -328,8 +442,25 @@ async def change_recovery_email(
                 return False, "未配置QQ邮箱，请先设置QQ邮箱和授权码", None
             
             log("步骤1: 生成自定义域名邮箱...")
-            # 测试连接
-            success, msg = test_qq_email_connection(qq_email, qq_auth_code)
+            # 测试连接（阻塞网络请求，放到线程池与 Step 2 的导航并发）
+            prepare = asyncio.to_thread(test_qq_email_connection, qq_email, qq_auth_code)
+        else:
+            # 使用临时邮箱
+            log("步骤1: 创建临时邮箱...")
+            prepare = asyncio.to_thread(create_temp_email)
+        
+        # Step 2: 导航到辅助邮箱页面（与 Step 1 同时进行）
+        log("步骤2: 导航到辅助邮箱设置页...")
+        prepared, navigated = await asyncio.gather(
+            prepare,
+            page.goto(RECOVERY_EMAIL_URL, wait_until="domcontentloaded", timeout=60000),
+            return_exceptions=True,
+        )
+        if isinstance(prepared, BaseException):
+            raise prepared
+        
+        if use_qq_email:
+            success, msg = prepared
             if not success:
                 return False, f"QQ邮箱连接失败: {msg}", None
             
@@ -337,16 +468,13 @@ async def change_recovery_email(
             new_email = generate_random_email()
             log(f"✅ 生成邮箱: {new_email} (验证码转发到 {qq_email})")
         else:
-            # 使用临时邮箱
-            log("步骤1: 创建临时邮箱...")
-            jwt, new_email = create_temp_email()
+            jwt, new_email = prepared
             if not jwt or not new_email:
                 return False, "创建临时邮箱失败", None
             log(f"✅ 临时邮箱: {new_email}")
         
-        # Step 2: 导航到辅助邮箱页面
-        log("步骤2: 导航到辅助邮箱设置页...")
-        await page.goto(RECOVERY_EMAIL_URL, wait_until="domcontentloaded", timeout=60000)
+        if isinstance(navigated, BaseException):
+            raise navigated
         await asyncio.sleep(3)
         
         # Step 3: 确保已登录
@@ -396,85 +524,48 @@ async def change_recovery_email(
             try:
                 # 使用 force=True 绕过可能的遮挡物（如插件 overlay）
                 await btn.click(force=True)
-                await asyncio.sleep(1)
                 
-                # 显式等待对话框出现
-                for _ in range(15):  # 最多等15秒
-                    try:
-                        dialog = page.locator('[role="dialog"]')
-                        if await dialog.count() > 0:
-                            # 检查是否有可见的对话框
-                            for i in range(min(await dialog.count(), 5)):
-                                d = dialog.nth(i)
-                                if await d.is_visible():
-                                    log(f"✅ {log_prefix} - 对话框已打开")
-                                    return True
-                    except Exception:
-                        pass
-                    
-                    # 也检查是否跳转到密码验证页
-                    try:
-                        pwd_input = page.locator('input[type="password"]')
-                        if await pwd_input.count() > 0 and await pwd_input.is_visible():
-                            log(f"✅ {log_prefix} - 跳转到密码验证页")
-                            return True
-                    except Exception:
-                        pass
-                    
-                    await asyncio.sleep(1)
+                # 显式等待对话框出现（或跳转到密码验证页），最多等15秒
+                try:
+                    hit = await page.wait_for_selector(_EDIT_RESULT_SEL, timeout=15000)
+                except Exception:
+                    log(f"⚠️ {log_prefix} - 点击后对话框未出现")
+                    return False
                 
-                log(f"⚠️ {log_prefix} - 点击后对话框未出现")
-                return False
+                if await hit.get_attribute("type") == "password":
+                    log(f"✅ {log_prefix} - 跳转到密码验证页")
+                else:
+                    log(f"✅ {log_prefix} - 对话框已打开")
+                return True
             except Exception as e:
                 log(f"⚠️ {log_prefix} 失败: {e}")
                 return False
 
         # 首先尝试在 "Your recovery email" 卡片区域内找编辑按钮
-        card_selectors = [
-            'div:has-text("Your recovery email")',
-            'div:has-text("recovery email")',
-            '[data-settingid*="RECOVERY"]',
-        ]
-        
-        for card_sel in card_selectors:
+        for card_sel in _RECOVERY_CARD_SELS:
             if edit_clicked:
                 break
             try:
                 card = page.locator(card_sel).first
                 if await card.count() > 0:
                     # 在卡片内找编辑按钮 - 优先使用 aria-label
-                    edit_btn = card.locator('button[aria-label*="Edit"], button[aria-label*="edit"]').first
-                    if await edit_btn.count() > 0 and await edit_btn.is_visible():
-                        if await _click_edit_and_wait_dialog(edit_btn, "点击编辑按钮 (卡片内 aria-label)"):
-                            edit_clicked = True
-                            break
+                    edit_btn = await _first_visible(card, _EDIT_BUTTON_SEL)
+                    if edit_btn is not None:
+                        edit_clicked = await _click_edit_and_wait_dialog(edit_btn, "点击编辑按钮 (卡片内 aria-label)")
                     # 备选：找带 svg 的按钮
-                    edit_btn = card.locator('button:has(svg)').first
-                    if await edit_btn.count() > 0 and await edit_btn.is_visible():
-                        if await _click_edit_and_wait_dialog(edit_btn, "点击编辑按钮 (卡片内 svg)"):
-                            edit_clicked = True
-                            break
+                    if not edit_clicked:
+                        edit_btn = await _first_visible(card, _CARD_ICON_BUTTON_SEL)
+                        if edit_btn is not None:
+                            edit_clicked = await _click_edit_and_wait_dialog(edit_btn, "点击编辑按钮 (卡片内 svg)")
             except Exception:
                 continue
         
         # 备选：直接查找带有 Edit aria-label 的按钮
         if not edit_clicked:
-            edit_selectors = [
-                'button[aria-label*="Edit recovery"]',
-                'button[aria-label*="Edit"]',
-                'button[aria-label*="edit"]',
-                '[role="button"][aria-label*="Edit"]',
-            ]
-            
-            for selector in edit_selectors:
-                try:
-                    locator = page.locator(selector).first
-                    if await locator.count() > 0 and await locator.is_visible():
-                        if await _click_edit_and_wait_dialog(locator, f"点击编辑按钮 ({selector})"):
-                            edit_clicked = True
-                            break
-                except Exception:
-                    continue
+            locator = await _first_visible(page, _EDIT_BUTTON_SEL)
+            if locator is not None:
+                if await _click_edit_and_wait_dialog(locator, "点击编辑按钮 (aria-label)"):
+                    edit_clicked = True
         
         if not edit_clicked:
             return await fail_with_debug("step4_edit_button", "未找到编辑按钮或点击后对话框未打开")
@@ -498,18 +589,16 @@ async def change_recovery_email(
 
         root = page.locator('[data-help-context="RECOVERY_EMAIL_SCREEN"]').first
         try:
-            if await root.count() == 0 or not await root.is_visible():
+            if not await _is_visible(root):
                 root = page.locator("body")
         except Exception:
             root = page.locator("body")
 
         async def find_email_input():
             try:
-                import re
-
                 # 可能存在多个 dialog（有的隐藏），不能直接取 .first
                 dialogs = page.locator('[role="dialog"]').filter(
-                    has_text=re.compile(r"set up recovery email|recovery email|辅助邮箱|恢复邮箱", re.I)
+                    has_text=_DIALOG_TEXT_RE
                 )
                 if await dialogs.count() == 0:
                     dialogs = page.locator('[role="dialog"]')
@@ -526,17 +615,8 @@ async def change_recovery_email(
                         continue
 
                 if visible_dialog is not None:
-                    # 弹窗内优先用宽泛 selector：该输入框经常没有 aria-label/placeholder/type=email
-                    dialog_candidates = [
-                        'input[type="email"]',
-                        'input[aria-label*="recovery" i]',
-                        'input[placeholder*="email" i]',
-                        'input[autocomplete="email"]',
-                        'input[type="text"]',
-                        'textarea',
-                        'input:not([type="hidden"])',
-                    ]
-                    for sel in dialog_candidates:
+                    # 弹窗内优先用宽泛 selector
+                    for sel in _DIALOG_INPUT_SELS:
                         loc = visible_dialog.locator(sel).first
                         if await loc.count() > 0:
                             try:
@@ -551,14 +631,7 @@ async def change_recovery_email(
             except Exception:
                 pass
 
-            for sel in _email_input_selectors():
-                try:
-                    loc = root.locator(sel).first
-                    if await loc.count() > 0 and await loc.is_visible():
-                        return loc
-                except Exception:
-                    continue
-            return None
+            return await _first_visible(root, _EMAIL_INPUT_SEL)
 
         email_input = await find_email_input()
 
@@ -567,10 +640,8 @@ async def change_recovery_email(
             retried_after_auth = True
             log("⚠️ 未找到邮箱输入框，尝试重新点击编辑按钮...")
             try:
-                locator = page.locator(
-                    'button[aria-label*="Edit recovery"], button[aria-label*="Edit"], button[aria-label*="edit"]'
-                ).first
-                if await locator.count() > 0 and await locator.is_visible():
+                locator = await _first_visible(page, _EDIT_BUTTON_SEL)
+                if locator is not None:
                     await locator.click()
                     await _settle_page(page, timeout_ms=25000)
                     await _wait_after_edit_action(page, timeout_ms=25000)
@@ -596,24 +667,14 @@ async def change_recovery_email(
         log("步骤6: 点击 Save 按钮...")
         save_clicked = False
         
-        save_selectors = [
-            '[role="dialog"] button:has-text("Save")',
-            '[role="dialog"] button:has-text("保存")',
-            'button:has-text("Save")',
-            'button:has-text("保存")',
-            '[role="button"]:has-text("Save")',
-        ]
-        
-        for selector in save_selectors:
+        locator = await _first_visible(page, *_SAVE_BUTTON_SELS)
+        if locator is not None:
             try:
-                locator = page.locator(selector).first
-                if await locator.count() > 0 and await locator.is_visible():
-                    await locator.click()
-                    save_clicked = True
-                    log("✅ 点击 Save 成功")
-                    break
+                await locator.click()
+                save_clicked = True
+                log("✅ 点击 Save 成功")
             except Exception:
-                continue
+                pass
         
         if not save_clicked:
             return await fail_with_debug("step6_save_button", "未找到 Save 按钮")
@@ -625,17 +686,11 @@ async def change_recovery_email(
         
         # 等待验证码对话框出现
         verify_dialog = False
-        for _ in range(10):
-            try:
-                if await page.locator('text="Verify your recovery email"').count() > 0:
-                    verify_dialog = True
-                    break
-                if await page.locator('text="Verification code"').count() > 0:
-                    verify_dialog = True
-                    break
-            except:
-                pass
-            await asyncio.sleep(0.5)
+        try:
+            await page.wait_for_function(_VERIFY_DIALOG_JS, polling=_TEXT_POLL_MS, timeout=5000)
+            verify_dialog = True
+        except:
+            pass
         
         if not verify_dialog:
             # 检查是否已经成功（无需验证）
@@ -652,7 +707,7 @@ async def change_recovery_email(
         if use_qq_email:
             # 从QQ邮箱获取验证码（根据目标邮箱过滤，支持并发）
             log(f"从QQ邮箱获取验证码 (目标: {new_email})...")
-            success, result = qq_wait_code(
+            success, result = await qq_wait_code_async(
                 qq_email=qq_email,
                 auth_code=qq_auth_code,
                 target_email=new_email,  # 传入目标邮箱用于过滤
@@ -667,7 +722,10 @@ async def change_recovery_email(
         else:
             # 从临时邮箱获取验证码
             log("从临时邮箱获取验证码...")
-            code = wait_for_verification_code(jwt, timeout=120, poll_interval=5, log_callback=log)
+            # 同步轮询最长 120 秒，放到线程池，不阻塞事件循环
+            code = await asyncio.to_thread(
+                wait_for_verification_code, jwt, timeout=120, poll_interval=5, log_callback=log
+            )
         
         if not code:
             return await fail_with_debug("step7_code_timeout", "获取验证码超时")
@@ -676,24 +734,7 @@ async def change_recovery_email(
         log(f"步骤8: 输入验证码 {code}...")
         
         # 查找验证码输入框
-        code_input = None
-        code_selectors = [
-            '[role="dialog"] input[type="text"]',
-            '[role="dialog"] input[type="tel"]',
-            '[role="dialog"] input',
-            'input[aria-label*="code"]',
-            'input[aria-label*="验证码"]',
-            'input[placeholder*="code"]',
-        ]
-        
-        for selector in code_selectors:
-            try:
-                locator = page.locator(selector).first
-                if await locator.count() > 0 and await locator.is_visible():
-                    code_input = locator
-                    break
-            except Exception:
-                continue
+        code_input = await _first_visible(page, *_CODE_INPUT_SELS)
         
         if not code_input:
             return await fail_with_debug("step8_code_input", "未找到验证码输入框")
@@ -706,24 +747,14 @@ async def change_recovery_email(
         log("步骤9: 点击 Verify 按钮...")
         verify_clicked = False
         
-        verify_selectors = [
-            '[role="dialog"] button:has-text("Verify")',
-            '[role="dialog"] button:has-text("验证")',
-            'button:has-text("Verify")',
-            'button:has-text("验证")',
-            '[role="button"]:has-text("Verify")',
-        ]
-        
-        for selector in verify_selectors:
+        locator = await _first_visible(page, *_VERIFY_BUTTON_SELS)
+        if locator is not None:
             try:
-                locator = page.locator(selector).first
-                if await locator.count() > 0 and await locator.is_visible():
-                    await locator.click()
-                    verify_clicked = True
-                    log("✅ 点击 Verify 成功")
-                    break
+                await locator.click()
+                verify_clicked = True
+                log("✅ 点击 Verify 成功")
             except Exception:
-                continue
+                pass
         
         if not verify_clicked:
             return await fail_with_debug("step9_verify_button", "未找到 Verify 按钮")
@@ -733,13 +764,11 @@ async def change_recovery_email(
         # Step 10: 检查是否成功
         log("步骤10: 检查修改结果...")
         
-        # 检查页面是否显示新邮箱
+        # 检查页面是否显示新邮箱（精确匹配显示新邮箱的元素）
         try:
-            for _ in range(10):
-                if await page.locator(f'text="{new_email}"').count() > 0:
-                    log("✅ 辅助邮箱修改成功")
-                    return True, "辅助邮箱修改成功", new_email
-                await asyncio.sleep(0.5)
+            await page.wait_for_selector(f'text="{new_email}"', timeout=5000)
+            log("✅ 辅助邮箱修改成功")
+            return True, "辅助邮箱修改成功", new_email
         except:
             pass
         
@@ -11,6 +11,7 @@ import os
 import re
 import tempfile
 import time
+from functools import lru_cache
 from typing import Callable, Optional, Tuple
 
 import pyotp
@@ -185,6 +186,12 @@ async def _find_code_input(page: Page) -> Optional[Locator]:
     return None
 
 
+@lru_cache(maxsize=256)
+def _action_selector(keyword: str) -> str:
+    """按钮关键词对应的 CSS（同一关键词只拼一次）"""
+    return f'button:has-text("{keyword}"), [role="button"]:has-text("{keyword}")'
+
+
 async def _click_action_button(
     page: Page,
     keywords: list[str],
@@ -198,30 +205,14 @@ async def _click_action_button(
     except Exception:
         pass
     search_scopes.append(page)
+    # 主 frame 已由 page 覆盖，这里只补子 frame
+    search_scopes.extend(f for f in page.frames if f is not page.main_frame)
 
     for keyword in keywords:
+        selector = _action_selector(keyword)
         for scope in search_scopes:
             try:
-                loc = scope.locator(
-                    f'button:has-text("{keyword}"), [role="button"]:has-text("{keyword}")'
-                ).first
-                if await loc.count() > 0 and await loc.is_visible():
-                    try:
-                        await loc.scroll_into_view_if_needed()
-                    except Exception:
-                        pass
-                    await loc.click(force=True)
-                    await asyncio.sleep(1.5)
-                    if log_callback:
-                        log_callback(f"点击: {keyword}")
-                    return True
-            except Exception:
-                continue
-        for frame in page.frames:
-            try:
-                loc = frame.locator(
-                    f'button:has-text("{keyword}"), [role="button"]:has-text("{keyword}")'
-                ).first
+                loc = scope.locator(selector).first
                 if await loc.count() > 0 and await loc.is_visible():
                     try:
                         await loc.scroll_into_view_if_needed()